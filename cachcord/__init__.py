@@ -4,14 +4,25 @@
 """Main entrypoint for cachcord."""
 
 import argparse
+import inspect
+import itertools
 import logging
+import signal
+import time
 
 import arrow
 
+from . import board
 from . import cachet
+from . import delivery
 from . import discord
+from . import history
+from . import maintenance
+from . import metrics
 from . import persistence
+from . import rollups
 from . import settings
+from . import storm
 
 PARSER = argparse.ArgumentParser(
     description="Cachet to Discord synchronisation script",
@@ -33,18 +44,73 @@ PARSER.add_argument(
     required=True,
     help="Path of the persistence file",
 )
+PARSER.add_argument(
+    '--interval',
+    type=int,
+    default=0,
+    help="Keep running, synchronising every INTERVAL seconds (single run by default)",
+)
+SUBPARSERS = PARSER.add_subparsers(dest='command')
+HISTORY_PARSER = SUBPARSERS.add_parser(
+    'history',
+    help="Show recorded component status transitions",
+)
+HISTORY_PARSER.add_argument(
+    '--component',
+    type=int,
+    default=None,
+    help="Only show transitions of the given component id",
+)
+HISTORY_PARSER.add_argument(
+    '--since',
+    default=None,
+    help="Only show transitions detected at or after this ISO 8601 date",
+)
+HISTORY_PARSER.add_argument(
+    '--until',
+    default=None,
+    help="Only show transitions detected at or before this ISO 8601 date",
+)
 
 LOGGER = logging.getLogger()
 
 
-def main(config_path, persist_path, debug=False):
-    """Main function."""
+def main(config_path, persist_path, debug=False, interval=0):
+    """Main function.
+
+    When an interval is given, keeps synchronising and reloads the configuration whenever its
+    file changes or SIGHUP is received.
+    """
 
     if debug:
         LOGGER.setLevel(logging.DEBUG)
     logging.info("Setting debug to %s", debug)
 
-    settings.CONFIG.read(config_path)
+    config = settings.ReloadableSettings(config_path)
+    if not interval:
+        synchronise(config.current, persist_path)
+        return
+
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, config.request_reload)
+    while True:
+        try:
+            synchronise(config.refresh(), persist_path)
+        except Exception:  # pylint: disable=W0703
+            logging.exception("Synchronisation failed, retrying in %ds", interval)
+        time.sleep(interval)
+
+
+def synchronise(config, persist_path):
+    """Runs a single synchronisation with the given Settings.
+
+    Progress is checkpointed while fetching and delivering component updates, an interrupted run
+    is resumed from its checkpoint by the next one.
+    """
+
+    log = history.HistoryLog(_history_path(config, persist_path))
+    checkpoint = persistence.Checkpoint(persist_path + '.checkpoint')
+    position = checkpoint.load()
 
     last_update = arrow.now()
     with persistence.persistent_storage(persist_path, writeback=True) as storage:
@@ -52,29 +118,297 @@ def main(config_path, persist_path, debug=False):
             last_update = arrow.get(storage['last_update'])
             logging.info('Last run detected, was on %s', last_update.isoformat())
         api = cachet.CachetAPI(
-            token=settings.CONFIG.get('Cachet', 'api_token'),
-            base_url=settings.CONFIG.get('Cachet', 'api_url'),
+            token=config.cachet_api_token,
+            base_url=config.cachet_api_url,
         )
+        queue = delivery.DeliveryQueue(config.delivery_group_importance)
+        if position is not None:
+            logging.info('Resuming interrupted run from page %d', position['page'])
+            if 'components' not in storage:
+                storage['components'] = dict()
+            storage['components'].update(position['components'])
+            for item in position['pending'].values():
+                if item is not None:
+                    queue.push(item[1], item[0])
+            queue.take_changes()
+
+        def save_checkpoint():
+            """Saves the feed position along with the changes since the previous checkpoint.
+
+            Nothing is saved while no component nor notification changed.
+            """
+
+            components = feed.take_changes()
+            pending = queue.take_changes()
+            if not components and not pending:
+                return
+            data = feed.position()
+            data.update(components=components, pending=pending)
+            checkpoint.save(data)
+
         feed = cachet.CachetComponentUpdateFeed(
             api=api,
             storage=storage,
             last_update=last_update,
+            history=log,
+            position=position,
+            checkpoint=save_checkpoint,
+            checkpoint_interval=config.checkpoint_interval,
+            full_sweep_interval=config.polling_full_sweep_interval,
         )
+        webhook = discord.DiscordWebhook(config.discord_webhook_url,
+                                         pipeline=config.discord_pipeline)
         try:
-            for component in feed.updates:
-                new_status = component['status_name']
-                symbol = ":warning: :warning:"
-                if new_status == 'Operational':
-                    symbol = ":ballot_box_with_check: :ballot_box_with_check:"
-                webhook = discord.DiscordWebhook(settings.CONFIG.get('Discord', 'webhook_url'))
-                message = settings.CONFIG.get('Discord', 'message_template').format(
-                    symbol=symbol,
-                    component=component,
-                )
-                webhook.send_message(message)
-                last_update = feed.last_update
+            if config.incidents_enabled:
+                _deliver_incidents(config, api, webhook, storage)
+            if config.maintenance_enabled:
+                _deliver_maintenance(config, api, webhook, storage)
+            try:
+                last_update = _deliver_updates(config, feed, queue, webhook, save_checkpoint)
+            except Exception:
+                save_checkpoint()
+                raise
+            checkpoint.clear()
+            if config.board_enabled:
+                _update_board(config, webhook, storage)
+            if config.metrics_enabled:
+                _check_metrics(config, api, webhook, storage)
         finally:
+            webhook.close()
             storage['last_update'] = last_update.isoformat()
+        if config.digest_enabled:
+            _send_digest(config, webhook, storage, log)
+
+
+def _deliver_updates(config, feed, queue, webhook, save_checkpoint):
+    """Queues every component update from the feed, then sends them by priority.
+
+    Notifications are pipelined when enabled, and confirmed before each checkpoint. Returns the
+    feed's last update once every notification went through.
+    """
+
+    for component in feed.updates:
+        if not config.board_enabled:
+            queue.push(component)
+
+    storm_state = None
+    if config.storm_threshold and not config.board_enabled:
+        detector = storm.StormDetector(feed.storage, config.storm_threshold, config.storm_window)
+        storm_state = detector.update(len(queue))
+    if storm_state == storm.STORM:
+        components = [component for _, component in queue.pending()]
+        logging.info("Incident storm detected, summarising %d changes", len(components))
+        _send_lines(webhook, storm.summarize(components, cachet.component_groups(feed.api),
+                                             config.storm_max_names))
+        queue.clear()
+        return feed.last_update
+
+    sent_count = 0
+    in_flight = list()
+    while queue:
+        component = queue.pop()
+        message = _format_update(config, component, feed.storage)
+        if message is None:
+            logging.info("Muted %s's status change during maintenance", component['name'])
+            continue
+        if config.discord_pipeline:
+            in_flight.append((component, webhook.send_message(message, wait=False)))
+        else:
+            try:
+                webhook.send_message(message)
+            except Exception:
+                queue.push(component)
+                raise
+        sent_count = sent_count + 1
+        if config.checkpoint_interval and sent_count % config.checkpoint_interval == 0:
+            _confirm(queue, in_flight)
+            save_checkpoint()
+    _confirm(queue, in_flight)
+
+    if storm_state == storm.SETTLED:
+        components = feed.storage.get('components', dict()).values()
+        _send_lines(webhook, storm.reconcile(components, cachet.component_groups(feed.api),
+                                             config.storm_max_names))
+    return feed.last_update
+
+
+def _confirm(queue, in_flight):
+    """Waits for pipelined notifications, queueing failed ones again and raising the first."""
+
+    error = None
+    for component, future in in_flight:
+        try:
+            future.result()
+        except Exception as exception:  # pylint: disable=W0703
+            queue.push(component)
+            error = error or exception
+    del in_flight[:]
+    if error is not None:
+        raise error
+
+
+def _send_lines(webhook, lines):
+    """Sends lines through the webhook, grouped in as few messages as possible."""
+
+    for message in discord.split_lines(lines):
+        webhook.send_message(message)
+
+
+def _format_update(config, component, storage):
+    """Renders the status change notification of a component, linking its ongoing incident.
+
+    Returns None when the component is under a maintenance window muting its changes.
+    """
+
+    symbol = ":warning: :warning:"
+    if component['status_name'] == 'Operational':
+        symbol = ":ballot_box_with_check: :ballot_box_with_check:"
+    message = config.discord_message_template.format(
+        symbol=symbol,
+        component=component,
+    )
+    if config.incidents_enabled and 'incidents' in storage:
+        incident = storage['incidents']['components'].get(str(component['id']))
+        if incident is not None:
+            message = message + config.incidents_link_template.format(incident=incident)
+    if config.maintenance_enabled:
+        schedule = maintenance.active_schedule(storage, component['id'])
+        if schedule is not None:
+            if config.maintenance_mode == 'mute':
+                return None
+            message = message + config.maintenance_annotation_template.format(schedule=schedule)
+    return message
+
+
+def _deliver_incidents(config, api, webhook, storage):
+    """Posts new incidents, incident updates and incident edits."""
+
+    templates = {
+        'new': config.incidents_message_template,
+        'update': config.incidents_update_template,
+        'edit': config.incidents_edit_template,
+    }
+    feed = cachet.CachetIncidentFeed(api, storage, per_page=config.incidents_per_page)
+    components = storage.get('components', dict())
+    for event in feed.events:
+        component = components.get(str(event.incident.get('component_id')))
+        message = templates[event.kind].format(
+            incident=event.incident,
+            update=event.update,
+            component='`%s`' % component['name'] if component else "the status page",
+        )
+        _send_lines(webhook, [message])
+
+
+def _deliver_maintenance(config, api, webhook, storage):
+    """Indexes new and updated schedules, then posts the maintenance reminders due.
+
+    Events are only recorded once posted, so that the ones left by a failure are posted by the
+    next run.
+    """
+
+    templates = {
+        'reminder': config.maintenance_reminder_template,
+        'started': config.maintenance_started_template,
+        'completed': config.maintenance_completed_template,
+    }
+    feed = cachet.CachetScheduleFeed(api, storage, per_page=config.maintenance_per_page)
+    windows = maintenance.MaintenanceWindows(storage, reminders=config.maintenance_reminders)
+    now = arrow.now()
+    events = itertools.chain(
+        itertools.chain.from_iterable(windows.index(schedule, now) for schedule in feed.changes),
+        windows.advance(now),
+    )
+
+    components = storage.get('components', dict())
+    for event in events:
+        names = ['`%s`' % components[str(component_id)]['name']
+                 for component_id in event.schedule['components']
+                 if str(component_id) in components]
+        message = templates[event.kind].format(
+            schedule=event.schedule,
+            components=', '.join(names) or "the status page",
+            remaining=rollups.format_duration(event.offset) if event.offset else '',
+        )
+        _send_lines(webhook, [message])
+
+
+def _update_board(config, webhook, storage):
+    """Refreshes the status board messages with every known component."""
+
+    status_board = board.StatusBoard(
+        webhook,
+        storage,
+        header=config.board_header,
+        line_template=config.board_line_template,
+    )
+    requests_count = status_board.update(storage.get('components', dict()).values())
+    logging.debug("Status board updated with %d request(s)", requests_count)
+
+
+def _check_metrics(config, api, webhook, storage):
+    """Evaluates metric rules over new metric points and posts the resulting alerts."""
+
+    feed = metrics.CachetMetricFeed(api, storage, per_page=config.metrics_per_page)
+    details = dict()
+    for alert in feed.check(config.metric_rules):
+        if alert.metric_id not in details:
+            details[alert.metric_id] = feed.metric(alert.metric_id)
+        template = config.metrics_message_template
+        if alert.recovered:
+            template = config.metrics_recovery_template
+        webhook.send_message(template.format(
+            metric=details[alert.metric_id],
+            rule=metrics.describe_rule(alert.rule),
+            value=alert.value,
+            count=alert.count,
+        ))
+
+
+def _send_digest(config, webhook, storage, log):
+    """Updates rollups from the history log, then posts the availability digest when due."""
+
+    component_rollups = rollups.ComponentRollups(storage)
+    component_rollups.update(log)
+    if not component_rollups.digest_due(config.digest_period):
+        return
+    lines = [config.digest_title]
+    lines.extend(component_rollups.digest(storage.get('components', dict()).values(),
+                                          config.digest_period))
+    _send_lines(webhook, lines)
+
+
+def show_history(config_path, persist_path,  # pylint: disable=R0913
+                 component=None, since=None, until=None, debug=False):
+    """Prints recorded component status transitions."""
+
+    if debug:
+        LOGGER.setLevel(logging.DEBUG)
+
+    log = history.HistoryLog(_history_path(settings.load(config_path), persist_path))
+
+    with persistence.persistent_storage(persist_path) as storage:
+        components = storage.get('components', dict())
+    for transition in log.transitions(component_id=component, since=since, until=until):
+        name = components.get(str(transition.component_id), dict()).get('name', '?')
+        print("{time} {name} ({id}): {previous} -> {status}".format(
+            time=arrow.get(transition.timestamp).isoformat(),
+            name=name,
+            id=transition.component_id,
+            previous=cachet.COMPONENT_STATUSES.get(transition.previous_status, '?'),
+            status=cachet.COMPONENT_STATUSES.get(transition.status, '?'),
+        ))
+
+
+def _history_path(config, persist_path):
+    """Returns the configured history log directory, defaulting next to the persistence file."""
+
+    return config.history_path or persist_path + '.history'
+
+
+COMMANDS = {
+    'history': show_history,
+}
 
 
 def entry_point():
@@ -82,7 +416,11 @@ def entry_point():
 
     args = PARSER.parse_args()
     LOGGER.setLevel(logging.WARNING)
-    main(**args.__dict__)
+    arguments = dict(args.__dict__)
+    function = COMMANDS.get(arguments.pop('command', None), main)
+    # Top-level options are parsed for every command, only pass the ones it accepts.
+    parameters = inspect.signature(function).parameters
+    function(**{name: value for name, value in arguments.items() if name in parameters})
 
 if __name__ == '__main__':  # pragma: no cover
     entry_point()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""Discord status board module."""
+
+import logging
+
+import requests
+
+from . import discord
+
+DEFAULT_HEADER = "**Components status**"
+DEFAULT_LINE_TEMPLATE = "{symbol} `{component[name]}`: {component[status_name]}"
+
+
+class StatusBoard(object):
+    """Keeps a few webhook messages listing every component's status up to date.
+
+    Messages are edited in place, and only when their rendered content actually changed.
+    """
+
+    def __init__(self, webhook, storage, header=DEFAULT_HEADER,
+                 line_template=DEFAULT_LINE_TEMPLATE):
+        self.webhook = webhook
+        self.storage = storage
+        self.header = header
+        self.line_template = line_template
+
+        if 'board' not in self.storage:
+            self.storage['board'] = {
+                'messages': list(),
+            }
+
+    def render(self, components):
+        """Returns the board pages for the given components."""
+
+        lines = [self.header]
+        for component in sorted(components, key=lambda component: (
+                component.get('group_id') or 0,
+                component.get('order') or 0,
+                component['name'],
+        )):
+            symbol = ":warning:"
+            if component['status'] == 1:
+                symbol = ":ballot_box_with_check:"
+            lines.append(self.line_template.format(symbol=symbol, component=component))
+        return discord.split_lines(lines)
+
+    def update(self, components):
+        """Synchronises the board messages with the given components, returns requests count."""
+
+        pages = self.render(components)
+        messages = self.storage['board']['messages']
+        requests_count = 0
+
+        for position, page in enumerate(pages):
+            if position < len(messages):
+                if messages[position]['content'] == page:
+                    continue
+                try:
+                    self.webhook.edit_message(messages[position]['id'], page)
+                    messages[position]['content'] = page
+                    requests_count = requests_count + 1
+                    continue
+                except requests.HTTPError as error:
+                    if error.response is None or error.response.status_code != 404:
+                        raise
+                    logging.info("StatusBoard.update: message %s vanished, reposting",
+                                 messages[position]['id'])
+                    # Later pages must be reposted as well to preserve ordering.
+                    self._delete(messages[position + 1:])
+                    del messages[position:]
+                    requests_count = requests_count + 1
+            message = self.webhook.send_message(page)
+            messages.append({'id': message['id'], 'content': page})
+            requests_count = requests_count + 1
+
+        requests_count = requests_count + self._delete(messages[len(pages):])
+        del messages[len(pages):]
+        self.storage['board']['messages'] = messages
+        return requests_count
+
+    def _delete(self, messages):
+        """Deletes the given board messages, ignoring the ones already gone."""
+
+        for message in messages:
+            try:
+                self.webhook.delete_message(message['id'])
+            except requests.HTTPError as error:
+                if error.response is None or error.response.status_code != 404:
+                    raise
+        return len(messages)
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
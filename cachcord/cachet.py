@@ -2,11 +2,27 @@
 
 """Cachet interactions module."""
 
+import collections
 import logging
 
 import arrow
 import requests
 
+COMPONENT_STATUSES = {
+    0: 'Unknown',
+    1: 'Operational',
+    2: 'Performance Issues',
+    3: 'Partial Outage',
+    4: 'Major Outage',
+}
+
+OPERATIONAL = 1
+
+INCIDENT_FIXED = 4
+SCHEDULE_COMPLETE = 2
+
+IncidentEvent = collections.namedtuple('IncidentEvent', ['kind', 'incident', 'update'])
+
 
 class CachetAPI(object):  # pylint: disable=R0903
     """Provides an abstraction to a given Cachet installation's Web API."""
@@ -33,40 +49,138 @@ class CachetAPI(object):  # pylint: disable=R0903
 
         return self._method('get', endpoint, *args, **kwargs)
 
+    def pages(self, endpoint, params=None, first_page=1):
+        """Generator which yields the page number and decoded body of each page of a listing."""
+
+        current_page = first_page
+        finished = False
+        while not finished:
+            page_params = dict(params or dict())
+            page_params['page'] = current_page
+            data = self.get(endpoint, params=page_params).json()
+
+            yield current_page, data
+
+            if data['meta']['pagination']['total_pages'] <= current_page:
+                finished = True
+            else:
+                current_page = current_page + 1
+
+
+def component_groups(api):
+    """Returns the names of every component group, by id."""
 
-class CachetComponentUpdateFeed(object):
-    """Provides an interface for fetching component updates since last run."""
+    return {
+        group['id']: group['name']
+        for _, data in api.pages('/components/groups')
+        for group in data['data']
+    }
 
-    def __init__(self, api, storage, last_update=None):
+
+class CachetComponentUpdateFeed(object):  # pylint: disable=R0902
+    """Provides an interface for fetching component updates since last run.
+
+    The feed keeps track of its position (current page and components processed within it) and
+    of the components it changed in storage since they were last taken, so that an interrupted
+    run can be resumed. When a checkpoint callable is given, it is called every
+    checkpoint_interval processed components.
+
+    When full_sweep_interval is set, the whole catalogue is only fetched once per interval, other
+    runs only fetch non-operational components and infer that the ones previously seen as
+    non-operational but no longer returned are back to operational.
+    """
+
+    def __init__(self, api, storage, last_update=None,  # pylint: disable=R0913
+                 history=None, position=None, checkpoint=None, checkpoint_interval=0,
+                 full_sweep_interval=0):
         self.api = api
         self.storage = storage
+        self.history = history
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.full_sweep_interval = full_sweep_interval
 
         if last_update is None:
             last_update = arrow.now()
         self.last_update = last_update
 
+        self.page = 1
+        self.processed = set()
+        self.changed = dict()
+        if position is not None:
+            self.page = position['page']
+            self.processed = set(position['processed'])
+
+    def position(self):
+        """Returns the resumable position of the feed."""
+
+        return {
+            'page': self.page,
+            'processed': sorted(self.processed),
+        }
+
+    def take_changes(self):
+        """Returns the components changed in storage since the last call."""
+
+        changed, self.changed = self.changed, dict()
+        return changed
+
+    @property
+    def full_sweep_due(self):
+        """Whether the whole catalogue should be fetched on this run."""
+
+        if not self.full_sweep_interval or self.page != 1 or self.processed:
+            return True
+        last_full_sweep = self.storage.get('last_full_sweep')
+        if last_full_sweep is None:
+            return True
+        return arrow.now().float_timestamp >= last_full_sweep + self.full_sweep_interval
+
     @property
     def components(self):
-        """Generator which yields all components."""
+        """Generator which yields the components to check on this run."""
 
-        current_page = 1
-        finished = False
-        while not finished:
-            response = self.api.get(
-                '/components',
-                params={
-                    'page': current_page,
-                },
-            )
-            data = response.json()
+        if not self.full_sweep_due:
+            for component in self.interesting_components:
+                yield component
+            return
+        for component in self.all_components:
+            yield component
+        self.storage['last_full_sweep'] = arrow.now().float_timestamp
 
+    @property
+    def all_components(self):
+        """Generator which yields all components, starting from the feed's position."""
+
+        for page, data in self.api.pages('/components', first_page=self.page):
+            if page != self.page:
+                self.page = page
+                self.processed = set()
             for component in data['data']:
-                yield component
+                if component['id'] not in self.processed:
+                    yield component
 
-            if data['meta']['pagination']['total_pages'] <= current_page:
-                finished = True
-            else:
-                current_page = current_page + 1
+    @property
+    def interesting_components(self):
+        """Generator which yields non-operational components, filtered by the Cachet API.
+
+        Components last seen as non-operational which are not returned anymore are yielded as
+        operational.
+        """
+
+        returned = set()
+        for status in sorted(COMPONENT_STATUSES):
+            if status == OPERATIONAL:
+                continue
+            for _, data in self.api.pages('/components', params={'status': status}):
+                for component in data['data']:
+                    returned.add(str(component['id']))
+                    yield component
+        known_components = list(self.storage.get('components', dict()).items())
+        for component_id, component in known_components:
+            if component['status'] != OPERATIONAL and component_id not in returned:
+                yield dict(component, status=OPERATIONAL,
+                           status_name=COMPONENT_STATUSES[OPERATIONAL])
 
     @property
     def updates(self):
@@ -74,16 +188,200 @@ class CachetComponentUpdateFeed(object):
 
         if 'components' not in self.storage:
             self.storage['components'] = dict()
+        processed_count = 0
         for current_component in self.components:
+            # Checkpoint once the previous component has been handled by the caller.
+            if self.checkpoint is not None and self.checkpoint_interval and processed_count:
+                if processed_count % self.checkpoint_interval == 0:
+                    self.checkpoint()
+            processed_count = processed_count + 1
             self.last_update = arrow.get(current_component['created_at'])
+            self.processed.add(current_component['id'])
             current_id = str(current_component['id'])
             if current_id not in self.storage['components']:
                 self.storage['components'][current_id] = current_component
+                self.changed[current_id] = current_component
                 continue
             old_component = self.storage['components'][current_id]
             previous_status = old_component['status']
             if previous_status != current_component['status']:
                 self.storage['components'][current_id] = current_component
+                self.changed[current_id] = current_component
+                if self.history is not None:
+                    self.history.append(
+                        current_component['id'],
+                        previous_status,
+                        current_component['status'],
+                    )
                 yield current_component
 
+
+def _listing(api, endpoint, per_page):
+    return api.pages(endpoint, params={
+        'sort': 'updated_at',
+        'order': 'desc',
+        'per_page': per_page,
+    })
+
+
+def _updated_since(api, endpoint, cursor, per_page):
+    """Generator which yields the items of a listing updated since the cursor, newest first.
+
+    Listing stops at the first item older than the cursor, items updated at the cursor's date are
+    skipped when already seen. Every item is yielded without a cursor.
+    """
+
+    for _, data in _listing(api, endpoint, per_page):
+        for item in data['data']:
+            if cursor is not None:
+                if item['updated_at'] < cursor['updated_at']:
+                    return
+                if item['updated_at'] == cursor['updated_at'] and item['id'] in cursor['ids']:
+                    continue
+            yield item
+
+
+def _advance_cursor(cursor, items):
+    """Returns the cursor moved to the most recently updated of the given items, newest first."""
+
+    if not items:
+        return cursor
+    latest = items[0]['updated_at']
+    ids = [item['id'] for item in items if item['updated_at'] == latest]
+    if cursor is not None and cursor['updated_at'] == latest:
+        ids = cursor['ids'] + ids
+    return {'updated_at': latest, 'ids': ids}
+
+
+class CachetIncidentFeed(object):
+    """Provides an interface for fetching new and updated incidents since last run.
+
+    Incidents are listed by descending update date and listing stops at the first one already
+    seen, so that a single page is fetched in steady state. The first run only records existing
+    incidents, along with the cursor. The latest unresolved incident of each component is kept
+    for notifications to link.
+    """
+
+    def __init__(self, api, storage, per_page=20):
+        self.api = api
+        self.storage = storage
+        self.per_page = per_page
+
+        if 'incidents' not in self.storage:
+            self.storage['incidents'] = {
+                'cursor': None,
+                'known': dict(),
+                'components': dict(),
+            }
+        self.data = self.storage['incidents']
+
+    def component_incident(self, component_id):
+        """Returns the latest unresolved incident of a component, if any."""
+
+        return self.data['components'].get(str(component_id))
+
+    def _new_updates(self, incident):
+        """Returns the updates of an incident posted since last run, oldest first."""
+
+        last_update_id = self.data['known'].get(str(incident['id']), 0)
+        updates = list()
+        endpoint = '/incidents/%d/updates' % incident['id']
+        for _, data in self.api.pages(endpoint, params={'sort': 'id', 'order': 'desc'}):
+            for update in data['data']:
+                # Incidents recorded on the first run only know updates by date
+                if last_update_id is None:
+                    seen = update['created_at'] <= self.data['seeded_at']
+                else:
+                    seen = update['id'] <= last_update_id
+                if seen:
+                    updates.reverse()
+                    return updates
+                updates.append(update)
+        updates.reverse()
+        return updates
+
+    @property
+    def events(self):
+        """Generator which yields new incidents, incident updates and edits, oldest first.
+
+        Progress is recorded once each event went through, the cursor moving past an incident
+        once all of its events did.
+        """
+
+        if self.data['cursor'] is None:
+            self._seed()
+            return
+
+        changed = list(_updated_since(self.api, '/incidents', self.data['cursor'], self.per_page))
+        for incident in reversed(changed):
+            incident_id = str(incident['id'])
+            is_new = incident_id not in self.data['known']
+            updates = self._new_updates(incident)
+            if is_new:
+                yield IncidentEvent('new', incident, None)
+                self.data['known'][incident_id] = 0
+            for update in updates:
+                yield IncidentEvent('update', incident, update)
+                self.data['known'][incident_id] = update['id']
+            if not is_new and not updates:
+                yield IncidentEvent('edit', incident, None)
+            self._link_component(incident)
+            self.data['cursor'] = _advance_cursor(self.data['cursor'], [incident])
+
+    def _seed(self):
+        """Records every existing incident and links the unresolved ones to their component."""
+
+        incidents = [incident for _, data in _listing(self.api, '/incidents', self.per_page)
+                     for incident in data['data']]
+        for incident in reversed(incidents):
+            self.data['known'][str(incident['id'])] = None
+            self._link_component(incident)
+        # An empty cursor lists every incident created from now on
+        self.data['cursor'] = _advance_cursor({'updated_at': '', 'ids': list()}, incidents[:1])
+        self.data['seeded_at'] = self.data['cursor']['updated_at']
+
+    def _link_component(self, incident):
+        component_id = str(incident.get('component_id') or 0)
+        if component_id == '0':
+            return
+        if incident['status'] == INCIDENT_FIXED:
+            linked = self.data['components'].get(component_id)
+            if linked is not None and linked['id'] == incident['id']:
+                del self.data['components'][component_id]
+            return
+        self.data['components'][component_id] = {
+            key: incident.get(key) for key in ('id', 'name', 'status', 'human_status', 'permalink')
+        }
+
+
+class CachetScheduleFeed(object):  # pylint: disable=R0903
+    """Provides an interface for fetching scheduled maintenances created or updated since last run.
+
+    Schedules are listed by descending update date down to the cursor, the first run fetching
+    every schedule.
+    """
+
+    def __init__(self, api, storage, per_page=20):
+        self.api = api
+        self.storage = storage
+        self.per_page = per_page
+
+        if 'schedules' not in self.storage:
+            self.storage['schedules'] = {
+                'cursor': None,
+            }
+        self.data = self.storage['schedules']
+
+    @property
+    def changes(self):
+        """Generator which yields schedules updated since last run, oldest first.
+
+        The cursor moves past each schedule once the next one is requested.
+        """
+
+        changed = list(_updated_since(self.api, '/schedules', self.data['cursor'], self.per_page))
+        for schedule in reversed(changed):
+            yield schedule
+            self.data['cursor'] = _advance_cursor(self.data['cursor'], [schedule])
+
 #  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
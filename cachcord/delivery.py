@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""Notification delivery ordering module."""
+
+import heapq
+import itertools
+
+import arrow
+
+# Cachet status code to severity, operational notifications being the least urgent.
+SEVERITIES = {
+    4: 4,
+    3: 3,
+    2: 2,
+    0: 1,
+    1: 0,
+}
+
+
+class DeliveryQueue(object):
+    """Priority queue of pending component notifications.
+
+    Notifications are ordered by severity, then component group importance, then age. Pushing a
+    notification for a component supersedes its pending one, which is dropped instead of sent.
+
+    The queue keeps track of the notifications added and removed since the changes were last
+    taken, so that checkpoints only save these.
+    """
+
+    def __init__(self, group_importance=None):
+        self.group_importance = group_importance or dict()
+
+        self._heap = list()
+        self._latest = dict()
+        self._sequence = itertools.count()
+        self._changes = dict()
+
+    def __len__(self):
+        return len(self._latest)
+
+    def push(self, component, timestamp=None):
+        """Adds a component notification of a change made at timestamp.
+
+        Defaults to the component's update date, or now when it has none.
+        """
+
+        if timestamp is None:
+            if component.get('updated_at'):
+                timestamp = arrow.get(component['updated_at']).float_timestamp
+            else:
+                timestamp = arrow.now().float_timestamp
+        sequence = next(self._sequence)
+        priority = (
+            -SEVERITIES.get(component['status'], 0),
+            -self.group_importance.get(component.get('group_id'), 0),
+            timestamp,
+            sequence,
+        )
+        heapq.heappush(self._heap, (priority, component))
+        self._latest[component['id']] = sequence
+        self._changes[component['id']] = (timestamp, component)
+
+    def clear(self):
+        """Drops every pending notification."""
+
+        for component_id in self._latest:
+            self._changes[component_id] = None
+        self._heap = list()
+        self._latest = dict()
+
+    def take_changes(self):
+        """Returns the pending notification of every component changed since the last call.
+
+        Components whose notification was removed map to None.
+        """
+
+        changes, self._changes = self._changes, dict()
+        return changes
+
+    def pending(self):
+        """Returns the change timestamp and component of every pending notification."""
+
+        return [(priority[2], component) for priority, component in self._heap
+                if self._latest.get(component['id']) == priority[-1]]
+
+    def pop(self):
+        """Removes and returns the most urgent pending notification.
+
+        Raises IndexError when the queue is empty.
+        """
+
+        while self._heap:
+            priority, component = heapq.heappop(self._heap)
+            if self._latest.get(component['id']) == priority[-1]:
+                del self._latest[component['id']]
+                self._changes[component['id']] = None
+                return component
+        raise IndexError('pop from an empty DeliveryQueue')
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
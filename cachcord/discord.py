@@ -2,72 +2,205 @@
 
 """Discord-related operations module."""
 
+import concurrent.futures
 import logging
+import threading
 import time
 
 import arrow
 import requests
 
+MESSAGE_MAX_LENGTH = 2000
 
-class DiscordWebhook(object):  # pylint: disable=R0903
-    """Discord webhook-based interaction class."""
+# Delay before retrying a failed pipelined message, doubled on each attempt.
+RETRY_DELAY = 1
 
-    def __init__(self, url):
+
+def split_lines(lines, max_length=MESSAGE_MAX_LENGTH):
+    """Groups lines into as few messages as possible, each one fitting in max_length."""
+
+    messages = list()
+    current = ''
+    for line in lines:
+        line = line[:max_length]
+        if current and len(current) + 1 + len(line) > max_length:
+            messages.append(current)
+            current = ''
+        current = current + '\n' + line if current else line
+    if current:
+        messages.append(current)
+    return messages
+
+
+class DiscordWebhook(object):  # pylint: disable=R0902
+    """Discord webhook-based interaction class.
+
+    Messages sent without waiting are pipelined: up to `pipeline` requests are in flight over a
+    persistent session, sharing the rate budget, and transient failures are retried in the
+    background.
+    """
+
+    def __init__(self, url, pipeline=0, retries=3):
         self.url = url
+        self.pipeline = pipeline
+        self.retries = retries
 
         self.rate_exhausted = False
         self.next_reset = None
+        self.remaining = None
 
-    def send_message(self, message):
+        self._rate_lock = threading.Lock()
+        self._executor = None
+        self._session = None
+
+    def send_message(self, message, wait=True):
         """Send a message through the Discord webhook.
 
+        Waiting returns the created message. Otherwise the message is posted in the background,
+        and a Future resolving once Discord accepted it is returned.
+
         See https://discordapp.com/developers/docs/resources/webhook#execute-webhook
         """
 
-        logging.debug("DiscordWebhook.send_message(%s)", message)
-        message_submitted = False
-        request_delay = 0
-        if self.rate_exhausted:
-            request_delay = self.next_reset - arrow.now().timestamp
-            logging.debug('DiscordWebhook.send_message(%s), rate was exhausted, delay=%d',
-                          message, request_delay)
-            if request_delay < 0:
-                request_delay = 0
-        response = None
-        while not message_submitted:
-            if request_delay:
-                time.sleep(request_delay)
-                request_delay = 0
-                self.rate_exhausted = False
-                self.next_reset = None
-            response = requests.post(
-                self.url,
-                params={
-                    'wait': True,
-                },
-                data={
+        logging.debug("DiscordWebhook.send_message(%s, wait=%s)", message, wait)
+        if not wait:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max(self.pipeline, 1),
+                )
+                self._session = requests.Session()
+                self._session.mount('https://', requests.adapters.HTTPAdapter(
+                    pool_maxsize=max(self.pipeline, 1),
+                ))
+            return self._executor.submit(self._post_unconfirmed, message)
+
+        response = self._request(
+            'post',
+            self.url,
+            params={
+                'wait': True,
+            },
+            data={
+                'content': message,
+            },
+        )
+        return response.json()
+
+    def _post_unconfirmed(self, message):
+        """Posts a message without waiting for its creation, retrying transient failures."""
+
+        attempt = 0
+        while True:
+            try:
+                self._request('post', self.url, session=self._session, data={
                     'content': message,
-                },
-            )
+                })
+                return
+            except requests.RequestException as error:
+                response = getattr(error, 'response', None)
+                if attempt >= self.retries or (response is not None and
+                                               response.status_code < 500):
+                    raise
+                delay = RETRY_DELAY * 2 ** attempt
+                attempt = attempt + 1
+                logging.warning("DiscordWebhook: sending failed (%s), retrying in %ds",
+                                error, delay)
+                time.sleep(delay)
+
+    def close(self):
+        """Waits for pipelined messages, then releases the background workers and session."""
+
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True)
+        self._session.close()
+        self._executor = None
+        self._session = None
+
+    def edit_message(self, message_id, message):
+        """Edit a message previously sent through the Discord webhook.
+
+        See https://discordapp.com/developers/docs/resources/webhook#edit-webhook-message
+        """
+
+        logging.debug("DiscordWebhook.edit_message(%s, %s)", message_id, message)
+        response = self._request(
+            'patch',
+            '%s/messages/%s' % (self.url, message_id),
+            json={
+                'content': message,
+            },
+        )
+        return response.json()
+
+    def delete_message(self, message_id):
+        """Delete a message previously sent through the Discord webhook.
+
+        See https://discordapp.com/developers/docs/resources/webhook#delete-webhook-message
+        """
+
+        logging.debug("DiscordWebhook.delete_message(%s)", message_id)
+        self._request('delete', '%s/messages/%s' % (self.url, message_id))
+
+    def _request(self, name, url, session=None, **kwargs):
+        """Executes a webhook request, respecting Discord's rate limits."""
+
+        send = requests.__dict__[name] if session is None else getattr(session, name)
+        response = None
+        request_submitted = False
+        while not request_submitted:
+            self._reserve(url)
+            response = send(url, **kwargs)
             if response.status_code == 429:
-                request_delay = int(response.headers['Retry-After'])
+                request_delay = float(response.headers['Retry-After'])
                 logging.debug(
-                    'DiscordWebhook.send_message(%s):Rate limited, retrying in %ds',
-                    message,
+                    'DiscordWebhook._request(%s):Rate limited, retrying in %.3fs',
+                    url,
                     request_delay,
                 )
+                time.sleep(request_delay)
                 continue
             else:
-                message_submitted = True
-        if response.headers['X-RateLimit-Remaining'] == 0:
-            self.rate_exhausted = True
-            self.next_reset = int(response.headers['X-RateLimit-Reset'])
-            logging.debug(
-                'DiscordWebhook.send_message(%s):Last request exhausted rate, reset=%d',
-                message,
-                self.next_reset,
-            )
+                request_submitted = True
+        self._record(url, response)
         response.raise_for_status()
-        return response.json()
+        return response
+
+    def _reserve(self, url):
+        """Takes a request from the rate budget, waiting for the next reset once exhausted."""
+
+        with self._rate_lock:
+            if self.rate_exhausted:
+                request_delay = self.next_reset - arrow.now().timestamp
+                logging.debug('DiscordWebhook._request(%s), rate was exhausted, delay=%.3f',
+                              url, request_delay)
+                if request_delay > 0:
+                    time.sleep(request_delay)
+                self.rate_exhausted = False
+                self.next_reset = None
+                self.remaining = None
+            elif self.remaining is not None:
+                self.remaining = self.remaining - 1
+                if self.remaining <= 0 and self.next_reset is not None:
+                    self.rate_exhausted = True
+
+    def _record(self, url, response):
+        """Updates the rate budget from a response's headers, when present."""
+
+        if 'X-RateLimit-Remaining' not in response.headers or \
+                'X-RateLimit-Reset' not in response.headers:
+            return
+        with self._rate_lock:
+            remaining = int(response.headers['X-RateLimit-Remaining'])
+            self.next_reset = float(response.headers['X-RateLimit-Reset'])
+            if self.remaining is None or remaining < self.remaining:
+                self.remaining = remaining
+            if remaining == 0:
+                self.rate_exhausted = True
+                logging.debug(
+                    'DiscordWebhook._request(%s):Last request exhausted rate, reset=%.3f',
+                    url,
+                    self.next_reset,
+                )
 
 #  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+"""Component status history module.
+
+Transitions are appended to a compact binary log made of fixed-size records, each one holding
+the detection timestamp, the component id as well as the previous and new status codes.
+Records are always appended in chronological order, so that time ranges can be looked up by
+binary search over the memory-mapped log. A per-component index file listing the record numbers
+of each component allows the same lookups for a single component, without scanning the log.
+"""
+
+import collections
+import contextlib
+import mmap
+import os
+import struct
+
+import arrow
+
+RECORD = struct.Struct('<dIBB2x')
+INDEX_ENTRY = struct.Struct('<I')
+
+LOG_FILE_NAME = 'transitions.log'
+INDEX_DIR_NAME = 'index'
+
+Transition = collections.namedtuple(
+    'Transition',
+    ['timestamp', 'component_id', 'previous_status', 'status'],
+)
+
+
+def _bisect(count, key, value, right=False):
+    """Returns the first position within [0, count) whose key is not lower than value.
+
+    When right is set, returns the first position whose key is greater than value instead.
+    """
+
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        current = key(middle)
+        if current < value or (right and current == value):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _to_timestamp(value):
+    """Converts an optional arrow-compatible value to a float timestamp."""
+
+    if value is None:
+        return None
+    return arrow.get(value).float_timestamp
+
+
+@contextlib.contextmanager
+def _mapped_file(file_path):
+    """Memory-maps a file for reading, yields None when the file is missing or empty."""
+
+    if not os.path.isfile(file_path) or not os.path.getsize(file_path):
+        yield None
+        return
+    with open(file_path, 'rb') as mapped_file:
+        with contextlib.closing(
+                mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)) as mapping:
+            yield mapping
+
+
+class HistoryLog(object):
+    """Append-only component status transition log, stored within the given directory.
+
+    Readers ignore a partially written trailing record, the writer drops it before its first
+    append.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.log_path = os.path.join(path, LOG_FILE_NAME)
+        self.index_path = os.path.join(path, INDEX_DIR_NAME)
+
+        self.last_timestamp = None
+        self._repaired = False
+
+    def _repair(self):
+        """Drops any partially written trailing record and loads the last timestamp."""
+
+        self._repaired = True
+        if not os.path.isfile(self.log_path):
+            return
+
+        size = os.path.getsize(self.log_path)
+        if size % RECORD.size:
+            size = size - size % RECORD.size
+            with open(self.log_path, 'r+b') as log_file:
+                log_file.truncate(size)
+        if size:
+            with open(self.log_path, 'rb') as log_file:
+                log_file.seek(size - RECORD.size)
+                self.last_timestamp = RECORD.unpack(log_file.read(RECORD.size))[0]
+
+    def __len__(self):
+        """Returns the number of complete records in the log."""
+
+        if not os.path.isfile(self.log_path):
+            return 0
+        return os.path.getsize(self.log_path) // RECORD.size
+
+    def _component_index_path(self, component_id):
+        return os.path.join(self.index_path, '%d.idx' % int(component_id))
+
+    def append(self, component_id, previous_status, status, timestamp=None):
+        """Records a component status transition.
+
+        Timestamps older than the last recorded one are clamped, as the log must remain sorted.
+        """
+
+        if not self._repaired:
+            self._repair()
+        timestamp = _to_timestamp(timestamp)
+        if timestamp is None:
+            timestamp = arrow.now().float_timestamp
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            timestamp = self.last_timestamp
+
+        os.makedirs(self.index_path, exist_ok=True)
+        with open(self.log_path, 'ab') as log_file:
+            record_number = log_file.tell() // RECORD.size
+            log_file.write(RECORD.pack(
+                timestamp,
+                int(component_id),
+                int(previous_status or 0),
+                int(status),
+            ))
+        with open(self._component_index_path(component_id), 'ab') as index_file:
+            index_file.write(INDEX_ENTRY.pack(record_number))
+        self.last_timestamp = timestamp
+
+        return Transition(timestamp, int(component_id), int(previous_status or 0), int(status))
+
+    def transitions(self, component_id=None, since=None, until=None):
+        """Generator yielding recorded transitions, oldest first.
+
+        Both bounds are optional and inclusive, the component filter uses the per-component index.
+        """
+
+        since = _to_timestamp(since)
+        until = _to_timestamp(until)
+        with _mapped_file(self.log_path) as log_map:
+            if log_map is None:
+                return
+            record_count = len(log_map) // RECORD.size
+
+            def record(record_number):
+                """Unpacks the given record from the mapped log."""
+
+                return Transition(*RECORD.unpack_from(log_map, record_number * RECORD.size))
+
+            if component_id is None:
+                for record_number in self._range(record_count, lambda number: number,
+                                                 record, since, until):
+                    yield record(record_number)
+                return
+
+            with _mapped_file(self._component_index_path(component_id)) as index_map:
+                if index_map is None:
+                    return
+
+                def record_number_at(position):
+                    """Reads the record number stored at the given index position."""
+
+                    return INDEX_ENTRY.unpack_from(index_map, position * INDEX_ENTRY.size)[0]
+
+                # Index entries may outlive a truncated log after a crash, ignore them.
+                entry_count = _bisect(
+                    len(index_map) // INDEX_ENTRY.size,
+                    record_number_at,
+                    record_count,
+                )
+                for position in self._range(entry_count, record_number_at, record, since, until):
+                    yield record(record_number_at(position))
+
+    def transitions_from(self, record_number):
+        """Generator yielding recorded transitions starting at the given record number.
+
+        Allows consumers to follow the log incrementally by storing the number of records read.
+        """
+
+        with _mapped_file(self.log_path) as log_map:
+            if log_map is None:
+                return
+            for current in range(record_number, len(log_map) // RECORD.size):
+                yield Transition(*RECORD.unpack_from(log_map, current * RECORD.size))
+
+    @staticmethod
+    def _range(count, record_number_at, record, since, until):
+        """Returns the positions whose records fall between since and until."""
+
+        def timestamp_at(position):
+            """Reads the timestamp of the record referenced at the given position."""
+
+            return record(record_number_at(position)).timestamp
+
+        start = 0
+        if since is not None:
+            start = _bisect(count, timestamp_at, since)
+        end = count
+        if until is not None:
+            end = _bisect(count, timestamp_at, until, right=True)
+        return range(start, end)
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""Scheduled maintenance reminders and windows module."""
+
+import collections
+
+import arrow
+
+from . import cachet
+
+MODES = ('annotate', 'mute')
+
+MaintenanceEvent = collections.namedtuple('MaintenanceEvent', ['kind', 'schedule', 'offset'])
+
+
+class TimerWheel(object):
+    """Hashed timer wheel, persisted in a dict.
+
+    Timers are hashed by deadline into `size` slots of `resolution` seconds. Adding a timer is
+    O(1), and advancing the wheel only visits the slots of the elapsed ticks, at most one
+    rotation, timers due on a later rotation staying in place. Due timers are only removed once
+    handled, and the wheel only moves once they all were.
+    """
+
+    def __init__(self, data, resolution=60, size=1440):
+        self.data = data
+        self.resolution = resolution
+        self.size = size
+
+        self.data.setdefault('now', None)
+        self.data.setdefault('slots', dict())
+
+    @property
+    def now(self):
+        """Timestamp the wheel was last advanced to, None before the first advance."""
+
+        return self.data['now']
+
+    def add(self, deadline, payload):
+        """Schedules payload at the deadline timestamp."""
+
+        slot = int(deadline // self.resolution) % self.size
+        self.data['slots'].setdefault(slot, list()).append((deadline, payload))
+
+    def advance(self, now):
+        """Generator which yields the timers due by the now timestamp, oldest first.
+
+        Each timer is removed once the next one is requested, and the wheel moves to now once
+        every due timer was handled.
+        """
+
+        previous = self.data['now']
+        if previous is None:
+            self.data['now'] = now
+            return
+
+        first_tick = int(previous // self.resolution)
+        last_tick = min(int(now // self.resolution), first_tick + self.size - 1)
+        slots = self.data['slots']
+        due = list()
+        for tick in range(first_tick, last_tick + 1):
+            slot = tick % self.size
+            due.extend((timer, slot) for timer in slots.get(slot, list()) if timer[0] <= now)
+        due.sort(key=lambda item: item[0][0])
+
+        for timer, slot in due:
+            yield timer
+            slots[slot].remove(timer)
+            if not slots[slot]:
+                del slots[slot]
+        self.data['now'] = now
+
+
+def _timestamp(date):
+    return arrow.get(date).float_timestamp if date else None
+
+
+def _component_ids(schedule):
+    ids = list()
+    for component in schedule.get('components') or list():
+        if isinstance(component, dict):
+            component = component.get('component_id', component.get('id'))
+        ids.append(int(component))
+    return ids
+
+
+def active_schedule(storage, component_id):
+    """Returns the active maintenance window covering a component, if any."""
+
+    data = storage.get('maintenance')
+    if data is None:
+        return None
+    schedule_ids = data['active'].get(str(component_id))
+    if not schedule_ids:
+        return None
+    return data['schedules'][str(schedule_ids[0])]
+
+
+class MaintenanceWindows(object):
+    """Tracks scheduled maintenance windows, their reminders and the components they cover.
+
+    Reminders fire `reminders` seconds before a window starts, along with its start and
+    completion, through a timer wheel. Updating a schedule supersedes its pending timers, which
+    are dropped when due. Timers due before the first run are applied silently.
+
+    Events are yielded before their changes are recorded, so that an event whose notification
+    failed is yielded again on the next run.
+    """
+
+    def __init__(self, storage, reminders=(3600,), resolution=60, size=1440):
+        self.storage = storage
+        self.reminders = reminders
+
+        if 'maintenance' not in self.storage:
+            self.storage['maintenance'] = {
+                'schedules': dict(),
+                'active': dict(),
+                'wheel': dict(),
+            }
+        self.data = self.storage['maintenance']
+        self.wheel = TimerWheel(self.data['wheel'], resolution, size)
+
+    def _activate(self, schedule):
+        schedule['active'] = True
+        for component_id in schedule['components']:
+            self.data['active'].setdefault(str(component_id), list()).append(schedule['id'])
+
+    def _deactivate(self, schedule):
+        if not schedule['active']:
+            return False
+        schedule['active'] = False
+        for component_id in schedule['components']:
+            schedule_ids = self.data['active'][str(component_id)]
+            schedule_ids.remove(schedule['id'])
+            if not schedule_ids:
+                del self.data['active'][str(component_id)]
+        return True
+
+    def index(self, schedule, now=None):
+        """Generator which records a created or updated schedule, yielding its immediate events."""
+
+        if now is None:
+            now = arrow.now()
+        since = self.wheel.now
+        if since is None:
+            since = now.float_timestamp
+
+        previous = self.data['schedules'].get(str(schedule['id']))
+        stored = {key: schedule.get(key) for key in ('id', 'name', 'message', 'status')}
+        stored.update({
+            'components': _component_ids(schedule),
+            'starts': _timestamp(schedule.get('scheduled_at')),
+            'ends': _timestamp(schedule.get('completed_at')),
+            'version': previous['version'] + 1 if previous is not None else 1,
+            'active': False,
+        })
+        completed = stored['status'] == cachet.SCHEDULE_COMPLETE or stored['starts'] is None
+        if completed and previous is not None and previous['active']:
+            yield MaintenanceEvent('completed', stored, None)
+
+        if previous is not None:
+            self._deactivate(previous)
+        self.data['schedules'][str(schedule['id'])] = stored
+        if completed:
+            return
+
+        timers = [(stored['starts'] - offset, 'reminder', offset) for offset in self.reminders]
+        timers.append((stored['starts'], 'started', None))
+        if stored['ends'] is not None:
+            timers.append((stored['ends'], 'completed', None))
+        for deadline, kind, offset in timers:
+            if deadline > since:
+                self.wheel.add(deadline, (stored['id'], stored['version'], kind, offset))
+        if stored['starts'] <= since and (stored['ends'] is None or stored['ends'] > since):
+            self._activate(stored)
+
+    def advance(self, now=None):
+        """Generator which fires the timers due by now, yielding their events, oldest first."""
+
+        if now is None:
+            now = arrow.now()
+
+        for _, (schedule_id, version, kind, offset) in self.wheel.advance(now.float_timestamp):
+            schedule = self.data['schedules'].get(str(schedule_id))
+            if schedule is None or schedule['version'] != version:
+                continue
+            if kind == 'completed' and not schedule['active']:
+                continue
+            yield MaintenanceEvent(kind, schedule, offset)
+            if kind == 'started':
+                self._activate(schedule)
+            elif kind == 'completed':
+                self._deactivate(schedule)
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+"""Cachet metrics monitoring module.
+
+Only the metric points created since the previous run are fetched, then every rule of a metric is
+evaluated over the whole batch at once with NumPy, along with the few previous points needed by
+rate-of-change and rolling-window rules.
+"""
+
+import collections
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+RULE_KINDS = ('above', 'below', 'rate_above', 'mean_above', 'mean_below')
+
+MetricRule = collections.namedtuple('MetricRule', ['metric_id', 'kind', 'limit', 'window'])
+
+MetricAlert = collections.namedtuple(
+    'MetricAlert',
+    ['metric_id', 'rule', 'value', 'timestamp', 'count', 'recovered'],
+)
+
+
+def describe_rule(rule):
+    """Returns a short human-readable description of a rule."""
+
+    if rule.kind == 'above':
+        return 'above %g' % rule.limit
+    if rule.kind == 'below':
+        return 'below %g' % rule.limit
+    if rule.kind == 'rate_above':
+        return 'changing faster than %g/min' % rule.limit
+    return '%d-point mean %s %g' % (rule.window, rule.kind.split('_')[1], rule.limit)
+
+
+def _history_length(rule):
+    """Returns how many previous points a rule needs to be evaluated on a new one."""
+
+    if rule.kind == 'rate_above':
+        return 1
+    if rule.kind.startswith('mean_'):
+        return max(rule.window - 1, 0)
+    return 0
+
+
+def evaluate(rule, timestamps, values):
+    """Evaluates a rule over arrays of point timestamps and values.
+
+    Returns the evaluated series (the values themselves, their rate of change per minute or their
+    rolling mean) and the boolean mask of breaching points. Points lacking enough history to be
+    evaluated are NaN in the series and never breach.
+    """
+
+    if rule.kind in ('above', 'below'):
+        series = values
+    elif rule.kind == 'rate_above':
+        series = numpy.full(len(values), numpy.nan)
+        elapsed = numpy.diff(timestamps)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            series[1:] = numpy.where(
+                elapsed > 0,
+                numpy.abs(numpy.diff(values)) / elapsed * 60.0,
+                numpy.nan,
+            )
+    else:
+        window = max(rule.window, 1)
+        series = numpy.full(len(values), numpy.nan)
+        if len(values) >= window:
+            sums = numpy.concatenate(([0.0], numpy.cumsum(values)))
+            series[window - 1:] = (sums[window:] - sums[:-window]) / window
+
+    with numpy.errstate(invalid='ignore'):
+        if rule.kind.endswith('below'):
+            mask = series < rule.limit
+        else:
+            mask = series > rule.limit
+    return series, mask
+
+
+def _point_arrays(points):
+    """Returns the timestamps and values of metric points as float arrays."""
+
+    timestamps = numpy.array([point['created_at'] for point in points],
+                             dtype='datetime64[s]').astype(numpy.float64)
+    values = numpy.array([point['value'] for point in points], dtype=numpy.float64)
+    return timestamps, values
+
+
+class CachetMetricFeed(object):
+    """Provides incremental access to Cachet metric points and rule evaluation."""
+
+    def __init__(self, api, storage, per_page=100):
+        if numpy is None:  # pragma: no cover
+            raise RuntimeError('Metrics monitoring requires numpy, install cachcord[metrics].')
+        self.api = api
+        self.storage = storage
+        self.per_page = per_page
+
+        if 'metrics' not in self.storage:
+            self.storage['metrics'] = dict()
+
+    def _state(self, metric_id):
+        states = self.storage['metrics']
+        if str(metric_id) not in states:
+            states[str(metric_id)] = {
+                'page': None,
+                'last_id': 0,
+                'tail': list(),
+                'breached': dict(),
+            }
+        return states[str(metric_id)]
+
+    def metric(self, metric_id):
+        """Returns a single metric's details."""
+
+        return self.api.get('/metrics/%d' % metric_id).json()['data']
+
+    def points(self, metric_id):
+        """Returns the points created since the last call, as timestamp and value arrays.
+
+        Points are listed oldest first, so fetching resumes from the last page seen. A metric
+        seen for the first time only records its last page, kept as previous points for rules
+        spanning several points, so that past breaches are not reported.
+        """
+
+        state = self._state(metric_id)
+        endpoint = '/metrics/%d/points' % metric_id
+        params = {'per_page': self.per_page}
+
+        if state['page'] is None:
+            _, data = next(self.api.pages(endpoint, params=params))
+            last_page = data['meta']['pagination']['total_pages'] or 1
+            if last_page > 1:
+                _, data = next(self.api.pages(endpoint, params=params, first_page=last_page))
+            timestamps, values = _point_arrays(data['data'])
+            state['page'] = last_page
+            state['last_id'] = max([point['id'] for point in data['data']] or [0])
+            state['tail'] = numpy.column_stack((timestamps, values)).tolist()
+            return _point_arrays(list())
+
+        new_points = list()
+        for page, data in self.api.pages(endpoint, params=params, first_page=state['page']):
+            new_points.extend(point for point in data['data'] if point['id'] > state['last_id'])
+            state['page'] = page
+
+        if new_points:
+            state['last_id'] = max(point['id'] for point in new_points)
+        return _point_arrays(new_points)
+
+    def check(self, rules):
+        """Fetches new points of every metric with rules, returns the resulting alerts.
+
+        A rule raises at most one alert per run when it starts breaching, with the number of
+        breaching points and the worst value, and one when it stops breaching.
+        """
+
+        rules_by_metric = collections.OrderedDict()
+        for rule in rules:
+            rules_by_metric.setdefault(rule.metric_id, list()).append(rule)
+
+        alerts = list()
+        for metric_id, metric_rules in rules_by_metric.items():
+            timestamps, values = self.points(metric_id)
+            if not len(values):  # pylint: disable=C1801
+                continue
+            state = self._state(metric_id)
+            tail = numpy.array(state['tail'], dtype=numpy.float64).reshape(-1, 2)
+            all_timestamps = numpy.concatenate((tail[:, 0], timestamps))
+            all_values = numpy.concatenate((tail[:, 1], values))
+
+            for rule in metric_rules:
+                alerts.extend(self._check_rule(rule, state, all_timestamps, all_values,
+                                               len(tail)))
+
+            kept = len(all_values) - max(_history_length(rule) for rule in metric_rules)
+            state['tail'] = numpy.column_stack(
+                (all_timestamps[kept:], all_values[kept:]),
+            ).tolist()
+        return alerts
+
+    @staticmethod
+    def _check_rule(rule, state, timestamps, values, offset):
+        """Evaluates a rule over new points, offset being the count of previous points."""
+
+        series, mask = evaluate(rule, timestamps, values)
+        series, mask = series[offset:], mask[offset:]
+        key = '%s:%g:%d' % (rule.kind, rule.limit, rule.window)
+        breached = state['breached'].get(key, False)
+
+        previous = numpy.concatenate(([breached], mask[:-1]))
+        starts = numpy.flatnonzero(mask & ~previous)
+        alerts = list()
+        if len(starts):  # pylint: disable=C1801
+            worst = series[mask].min() if rule.kind.endswith('below') else series[mask].max()
+            alerts.append(MetricAlert(rule.metric_id, rule, float(worst),
+                                      float(timestamps[offset + starts[0]]),
+                                      int(mask.sum()), False))
+        if (breached or len(starts)) and not mask[-1]:
+            alerts.append(MetricAlert(rule.metric_id, rule, float(series[-1]),
+                                      float(timestamps[-1]), 0, True))
+        state['breached'][key] = bool(mask[-1])
+        return alerts
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
@@ -4,6 +4,7 @@
 
 import contextlib
 import os
+import pickle
 import shelve
 import stat
 
@@ -20,4 +21,58 @@ def persistent_storage(file_path, *args, **kwargs):
         yield storage
 
 
+class Checkpoint(object):
+    """Append-only pickle stream holding the resumable state of an unfinished run.
+
+    Each save appends the changes since the previous one, so its cost only depends on the size of
+    these changes. Loading merges the saved records in order, and clearing compacts the stream
+    away once the run completed.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def load(self):
+        """Returns the saved records merged together, or None when there are none.
+
+        Dict values update the ones saved before them, other values replace them. A record left
+        incomplete by an interrupted save is dropped.
+        """
+
+        if not os.path.isfile(self.file_path):
+            return None
+        data = None
+        with open(self.file_path, 'rb+') as checkpoint_file:
+            while True:
+                offset = checkpoint_file.tell()
+                try:
+                    record = pickle.load(checkpoint_file)
+                except (EOFError, pickle.UnpicklingError):
+                    break
+                if data is None:
+                    data = dict()
+                for key, value in record.items():
+                    if isinstance(value, dict):
+                        data.setdefault(key, dict()).update(value)
+                    else:
+                        data[key] = value
+            if checkpoint_file.tell() != offset:
+                checkpoint_file.truncate(offset)
+        return data
+
+    def save(self, data):
+        """Appends data to the saved records, and flushes it to disk."""
+
+        with open(self.file_path, 'ab') as checkpoint_file:
+            pickle.dump(data, checkpoint_file, pickle.HIGHEST_PROTOCOL)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+
+    def clear(self):
+        """Removes the saved records, if any."""
+
+        if os.path.isfile(self.file_path):
+            os.remove(self.file_path)
+
+
 #  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+"""Component availability rollups module.
+
+Rollups are maintained incrementally from the history log: each run only consumes the
+transitions recorded since the previous one, and appends them to the status spans of their
+component. Steady states cost nothing, summaries walk the spans overlapping their period.
+"""
+
+import arrow
+
+from . import cachet
+
+OPERATIONAL = 1
+
+
+def _new_summary():
+    return {
+        'statuses': dict(),
+        'incidents': 0,
+        'recoveries': 0,
+        'recovery_time': 0.0,
+    }
+
+
+def format_duration(seconds):
+    """Formats a duration in seconds to a short human-readable string."""
+
+    minutes = int(seconds) // 60
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        return '%dd %02dh' % (days, hours)
+    if hours:
+        return '%dh %02dm' % (hours, minutes)
+    return '%dm' % minutes
+
+
+class ComponentRollups(object):
+    """Incrementally maintained per-component status spans, summarised into availability.
+
+    Tracking starts when the rollups are created: transitions already in the history log are
+    skipped, and components are considered in their previous status since then until their first
+    transition. Spans older than retention are pruned, but for the one covering its start.
+    """
+
+    def __init__(self, storage, retention=366 * 86400):
+        self.storage = storage
+        self.retention = retention
+
+        if 'rollups' not in self.storage:
+            self.storage['rollups'] = {
+                'cursor': None,
+                'started': None,
+                'spans': dict(),
+                'last_digest': None,
+            }
+        self.data = self.storage['rollups']
+
+    def update(self, history_log, now=None):
+        """Consumes transitions recorded since the last update, returns how many were read."""
+
+        if self.data['cursor'] is None:
+            if now is None:
+                now = arrow.now()
+            self.data['cursor'] = len(history_log)
+            self.data['started'] = now.float_timestamp
+
+        count = 0
+        for transition in history_log.transitions_from(self.data['cursor']):
+            self.record(transition)
+            count = count + 1
+        self.data['cursor'] = self.data['cursor'] + count
+        return count
+
+    def record(self, transition):
+        """Accounts for a single status transition."""
+
+        component_id = str(transition.component_id)
+        spans = self.data['spans'].get(component_id)
+        if spans is None:
+            started = transition.timestamp
+            if self.data['started'] is not None:
+                started = min(self.data['started'], started)
+            spans = [(started, transition.previous_status)]
+            self.data['spans'][component_id] = spans
+        if spans[-1][1] == transition.status:
+            return
+        spans.append((transition.timestamp, transition.status))
+
+        cutoff = transition.timestamp - self.retention
+        while len(spans) > 1 and spans[1][0] <= cutoff:
+            spans.pop(0)
+
+    def summary(self, component_id, since, until, current_status=OPERATIONAL):
+        """Aggregates the spans of a component over [since, until).
+
+        The last span lasts until `until`, components without any recorded transition are
+        considered in current_status the whole time.
+        """
+
+        since = arrow.get(since).float_timestamp
+        until = arrow.get(until).float_timestamp
+        result = _new_summary()
+
+        spans = self.data['spans'].get(str(component_id))
+        if not spans:
+            if until > since:
+                result['statuses'][current_status] = until - since
+            return result
+
+        incident_start = None
+        for position, (start, status) in enumerate(spans):
+            end = spans[position + 1][0] if position + 1 < len(spans) else until
+            seconds = min(end, until) - max(start, since)
+            if seconds > 0:
+                result['statuses'][status] = result['statuses'].get(status, 0) + seconds
+
+            in_period = since <= start < until
+            previous_status = spans[position - 1][1] if position else None
+            if status != OPERATIONAL and (position == 0 or previous_status == OPERATIONAL):
+                incident_start = start
+                if position and in_period:
+                    result['incidents'] = result['incidents'] + 1
+            elif status == OPERATIONAL and incident_start is not None:
+                if in_period:
+                    result['recoveries'] = result['recoveries'] + 1
+                    result['recovery_time'] = result['recovery_time'] + start - incident_start
+                incident_start = None
+        return result
+
+    def digest_due(self, period, now=None):
+        """Returns whether a digest covering period seconds should be sent now.
+
+        The first call only starts the schedule, so that a digest always covers a full period.
+        """
+
+        if now is None:
+            now = arrow.now()
+        if self.data['last_digest'] is None:
+            self.data['last_digest'] = now.float_timestamp
+            return False
+        return now.float_timestamp >= self.data['last_digest'] + period
+
+    def digest(self, components, period, now=None):
+        """Returns availability report lines for the given components over the last period.
+
+        Periods are aligned on whole days.
+        """
+
+        if now is None:
+            now = arrow.now()
+        until = int(now.float_timestamp // 86400 * 86400)
+        since = until - period
+
+        lines = list()
+        for component in sorted(components, key=lambda component: component['name']):
+            result = self.summary(component['id'], since, until, component['status'])
+            total = sum(result['statuses'].values())
+            operational = result['statuses'].get(OPERATIONAL, 0)
+            availability = 100.0 * operational / total if total else 100.0
+            mttr = 'n/a'
+            if result['recoveries']:
+                mttr = format_duration(result['recovery_time'] / result['recoveries'])
+            lines.append("`{name}`: {availability:.2f}% available, {incidents} incident(s), "
+                         "MTTR {mttr}, currently {status}".format(
+                             name=component['name'],
+                             availability=availability,
+                             incidents=result['incidents'],
+                             mttr=mttr,
+                             status=cachet.COMPONENT_STATUSES.get(component['status'], '?'),
+                         ))
+        self.data['last_digest'] = now.float_timestamp
+        return lines
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
@@ -2,7 +2,101 @@
 
 """INI settings wrapper module."""
 
+import collections
 import configparser
+import logging
+import os
+import re
+import string
+
+from . import board
+from . import maintenance
+from . import metrics
+
+REQUIRED = object()
+
+# (attribute, section, option, ConfigParser getter, default)
+FIELDS = (
+    ('cachet_api_url', 'Cachet', 'api_url', 'get', REQUIRED),
+    ('cachet_api_token', 'Cachet', 'api_token', 'get', REQUIRED),
+    ('discord_webhook_url', 'Discord', 'webhook_url', 'get', REQUIRED),
+    ('discord_message_template', 'Discord', 'message_template', 'get', REQUIRED),
+    ('discord_pipeline', 'Discord', 'pipeline', 'getint', 0),
+    ('history_path', 'History', 'path', 'get', None),
+    ('board_enabled', 'Board', 'enabled', 'getboolean', False),
+    ('board_header', 'Board', 'header', 'get', board.DEFAULT_HEADER),
+    ('board_line_template', 'Board', 'line_template', 'get', board.DEFAULT_LINE_TEMPLATE),
+    ('digest_enabled', 'Digest', 'enabled', 'getboolean', False),
+    ('digest_period', 'Digest', 'period', 'getint', 7 * 86400),
+    ('digest_title', 'Digest', 'title', 'get', "**Availability report**"),
+    ('delivery_group_importance', 'Delivery', 'group_importance', 'getmapping', dict()),
+    ('checkpoint_interval', 'Checkpoint', 'interval', 'getint', 100),
+    ('polling_full_sweep_interval', 'Polling', 'full_sweep_interval', 'getint', 0),
+    ('storm_threshold', 'Storm', 'threshold', 'getint', 0),
+    ('storm_window', 'Storm', 'window', 'getint', 0),
+    ('storm_max_names', 'Storm', 'max_names', 'getint', 20),
+    ('incidents_enabled', 'Incidents', 'enabled', 'getboolean', False),
+    ('incidents_per_page', 'Incidents', 'per_page', 'getint', 20),
+    ('incidents_message_template', 'Incidents', 'message_template', 'get',
+     "**:newspaper: New incident on {component}: {incident[name]} "
+     "({incident[human_status]})**\n{incident[message]}"),
+    ('incidents_update_template', 'Incidents', 'update_template', 'get',
+     "**:newspaper: Incident update on {component}: {incident[name]} "
+     "({update[human_status]})**\n{update[message]}"),
+    ('incidents_edit_template', 'Incidents', 'edit_template', 'get',
+     "**:newspaper: Incident edited on {component}: {incident[name]} "
+     "({incident[human_status]})**\n{incident[message]}"),
+    ('incidents_link_template', 'Incidents', 'link_template', 'get',
+     ", see incident {incident[name]} ({incident[human_status]})"),
+    ('maintenance_enabled', 'Maintenance', 'enabled', 'getboolean', False),
+    ('maintenance_per_page', 'Maintenance', 'per_page', 'getint', 20),
+    ('maintenance_reminders', 'Maintenance', 'reminders', 'getintegers', (3600,)),
+    ('maintenance_mode', 'Maintenance', 'mode', 'get', 'annotate'),
+    ('maintenance_reminder_template', 'Maintenance', 'reminder_template', 'get',
+     "**:calendar: Scheduled maintenance {schedule[name]} on {components} "
+     "starts in {remaining}**"),
+    ('maintenance_started_template', 'Maintenance', 'started_template', 'get',
+     "**:construction: Scheduled maintenance {schedule[name]} on {components} has started**"),
+    ('maintenance_completed_template', 'Maintenance', 'completed_template', 'get',
+     "**:ballot_box_with_check: Scheduled maintenance {schedule[name]} on {components} "
+     "is completed**"),
+    ('maintenance_annotation_template', 'Maintenance', 'annotation_template', 'get',
+     ", under scheduled maintenance {schedule[name]}"),
+    ('metrics_enabled', 'Metrics', 'enabled', 'getboolean', False),
+    ('metrics_per_page', 'Metrics', 'per_page', 'getint', 100),
+    ('metrics_message_template', 'Metrics', 'message_template', 'get',
+     "**:chart_with_upwards_trend: Metric `{metric[name]}` is {rule}: "
+     "{value:.2f}{metric[suffix]} ({count} point(s))**"),
+    ('metrics_recovery_template', 'Metrics', 'recovery_template', 'get',
+     "**:ballot_box_with_check: Metric `{metric[name]}` is no longer {rule}**"),
+)
+
+# Template settings and the fields they may reference.
+TEMPLATE_FIELDS = {
+    'discord_message_template': ('symbol', 'component'),
+    'board_line_template': ('symbol', 'component'),
+    'incidents_message_template': ('incident', 'component'),
+    'incidents_update_template': ('incident', 'update', 'component'),
+    'incidents_edit_template': ('incident', 'component'),
+    'incidents_link_template': ('incident',),
+    'maintenance_reminder_template': ('schedule', 'components', 'remaining'),
+    'maintenance_started_template': ('schedule', 'components', 'remaining'),
+    'maintenance_completed_template': ('schedule', 'components', 'remaining'),
+    'maintenance_annotation_template': ('schedule',),
+    'metrics_message_template': ('metric', 'rule', 'value', 'count'),
+    'metrics_recovery_template': ('metric', 'rule', 'value', 'count'),
+}
+
+METRIC_SECTION = re.compile(r'^Metric (\d+)$')
+
+Settings = collections.namedtuple(
+    'Settings',
+    [field[0] for field in FIELDS] + ['metric_rules'],
+)
+
+
+class SettingsError(RuntimeError):
+    """Raised when a configuration file cannot be loaded or is invalid."""
 
 
 class CachcordConfigParser(configparser.ConfigParser):  # pylint: disable=R0901
@@ -19,6 +113,141 @@ class CachcordConfigParser(configparser.ConfigParser):  # pylint: disable=R0901
         self._loaded = True
         return super()._read(*args, **kwargs)
 
-CONFIG = CachcordConfigParser()
+
+def parse_mapping(value):
+    """Parses a comma-separated list of integer `key:value` pairs into a dict."""
+
+    mapping = dict()
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        key, separator, item_value = item.partition(':')
+        if not separator:
+            raise ValueError('Expected key:value, got %r' % item.strip())
+        mapping[int(key)] = int(item_value)
+    return mapping
+
+
+def parse_integers(value):
+    """Parses a comma-separated list of integers into a tuple."""
+
+    return tuple(int(item) for item in value.split(',') if item.strip())
+
+
+def _validate_template(name, template, allowed_fields):
+    """Ensures a message template only references the allowed fields."""
+
+    for _, field_name, _, _ in string.Formatter().parse(template):
+        if field_name is None:
+            continue
+        root = field_name.split('[', 1)[0].split('.', 1)[0]
+        if root not in allowed_fields:
+            raise SettingsError('Unknown field {%s} in %s' % (field_name, name))
+
+
+def _load_metric_rules(parser):
+    """Reads the rules of every `[Metric <id>]` section."""
+
+    rules = list()
+    for section in parser.sections():
+        match = METRIC_SECTION.match(section)
+        if match is None:
+            continue
+        window = parser.getint(section, 'window', fallback=1)
+        for kind in metrics.RULE_KINDS:
+            if parser.has_option(section, kind):
+                rules.append(metrics.MetricRule(
+                    int(match.group(1)),
+                    kind,
+                    parser.getfloat(section, kind),
+                    window,
+                ))
+    return tuple(rules)
+
+
+def load(config_path):
+    """Parses the configuration file into an immutable Settings instance.
+
+    Raises SettingsError when the file is unreadable, incomplete or invalid.
+    """
+
+    parser = CachcordConfigParser(converters={
+        'mapping': parse_mapping,
+        'integers': parse_integers,
+    })
+    try:
+        if not parser.read(config_path):
+            raise SettingsError('Unable to read configuration file %s' % config_path)
+    except configparser.Error as error:
+        raise SettingsError('Invalid configuration file %s: %s' % (config_path, error))
+
+    values = dict()
+    for name, section, option, getter, default in FIELDS:
+        try:
+            if default is REQUIRED:
+                values[name] = getattr(parser, getter)(section, option)
+            else:
+                values[name] = getattr(parser, getter)(section, option, fallback=default)
+        except (configparser.Error, ValueError) as error:
+            raise SettingsError('Invalid setting %s.%s: %s' % (section, option, error))
+    try:
+        values['metric_rules'] = _load_metric_rules(parser)
+    except ValueError as error:
+        raise SettingsError('Invalid metric rule: %s' % error)
+
+    for name, allowed_fields in TEMPLATE_FIELDS.items():
+        try:
+            _validate_template(name, values[name], allowed_fields)
+        except ValueError as error:
+            raise SettingsError('Invalid template %s: %s' % (name, error))
+
+    if values['maintenance_mode'] not in maintenance.MODES:
+        raise SettingsError('Invalid setting Maintenance.mode: expected one of %s, got %r' % (
+            ', '.join(maintenance.MODES), values['maintenance_mode']))
+
+    return Settings(**values)
+
+
+class ReloadableSettings(object):
+    """Holds the current Settings, reloading them when the configuration file changes.
+
+    Reloads replace the `current` reference at once, so that holders of the previous instance
+    keep a consistent view. Invalid configurations are logged and the previous one stays active.
+    """
+
+    def __init__(self, config_path):
+        self.config_path = config_path
+        self.reload_requested = False
+
+        self._signature = self._file_signature()
+        self.current = load(config_path)
+
+    def _file_signature(self):
+        try:
+            file_stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return (file_stat.st_mtime_ns, file_stat.st_size)
+
+    def request_reload(self, *_):
+        """Flags the configuration for reloading, usable as a signal handler."""
+
+        self.reload_requested = True
+
+    def refresh(self):
+        """Reloads the configuration if requested or modified, returns the current Settings."""
+
+        signature = self._file_signature()
+        if not self.reload_requested and signature == self._signature:
+            return self.current
+        self.reload_requested = False
+        self._signature = signature
+
+        try:
+            self.current = load(self.config_path)
+            logging.info("Configuration reloaded from %s", self.config_path)
+        except SettingsError as error:
+            logging.error("Configuration reload failed, keeping previous settings: %s", error)
+        return self.current
 
 #  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
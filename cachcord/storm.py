@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""Incident storm detection and summarisation module."""
+
+import collections
+
+import arrow
+
+from . import cachet
+
+STORM = 'storm'
+SETTLED = 'settled'
+
+
+class StormDetector(object):  # pylint: disable=R0903
+    """Detects runs whose component changes exceed a threshold.
+
+    Changes are counted on the current run, and over the runs of the last window seconds when a
+    window is given. The detector reports STORM for runs with changes while the threshold is
+    exceeded, nothing for quiet runs meanwhile, then SETTLED once on the first run below it.
+    """
+
+    def __init__(self, storage, threshold, window=0):
+        self.storage = storage
+        self.threshold = threshold
+        self.window = window
+
+        if 'storm' not in self.storage:
+            self.storage['storm'] = {
+                'runs': list(),
+                'active': False,
+            }
+        self.state = self.storage['storm']
+
+    def update(self, count, now=None):
+        """Records the number of changes of a run, returns STORM, SETTLED or None."""
+
+        if now is None:
+            now = arrow.now()
+        timestamp = now.float_timestamp
+
+        total = count
+        if self.window:
+            runs = [run for run in self.state['runs'] if run[0] > timestamp - self.window]
+            runs.append((timestamp, count))
+            self.state['runs'] = runs
+            total = sum(run_count for _, run_count in runs)
+
+        if count >= self.threshold or total >= self.threshold:
+            if not count:
+                return None
+            self.state['active'] = True
+            return STORM
+        if self.state['active']:
+            self.state['active'] = False
+            return SETTLED
+        return None
+
+
+def _names_line(components, max_names):
+    names = sorted(component['name'] for component in components)
+    line = ', '.join('`%s`' % name for name in names[:max_names])
+    if len(names) > max_names:
+        line = line + ' and %d more' % (len(names) - max_names)
+    return line
+
+
+def _counts_line(counter):
+    return ', '.join('%s: %d' % (label, count) for label, count in sorted(
+        counter.items(), key=lambda item: (-item[1], item[0])))
+
+
+def _group_label(component, group_names):
+    group_id = component.get('group_id')
+    if not group_id:
+        return 'Ungrouped'
+    return group_names.get(group_id, 'Group %s' % group_id)
+
+
+def _group_counts(components, group_names):
+    return collections.Counter(_group_label(component, group_names) for component in components)
+
+
+def summarize(components, group_names=None, max_names=20):
+    """Returns the lines summarising a storm of component changes.
+
+    Changes are counted per new status and per group, followed by the truncated list of names.
+    """
+
+    group_names = group_names or dict()
+    statuses = collections.Counter(
+        cachet.COMPONENT_STATUSES.get(component['status'], '?') for component in components
+    )
+    return [
+        "**:rotating_light: Incident storm: %d components changed status**" % len(components),
+        "By status: %s" % _counts_line(statuses),
+        "By group: %s" % _counts_line(_group_counts(components, group_names)),
+        "Affected: %s" % _names_line(components, max_names),
+    ]
+
+
+def reconcile(components, group_names=None, max_names=20):
+    """Returns the lines summarising the current status of components once a storm settled."""
+
+    group_names = group_names or dict()
+    affected = [component for component in components
+                if component['status'] != cachet.OPERATIONAL]
+    lines = ["**:ballot_box_with_check: Incident storm settled**"]
+    if not affected:
+        lines.append("All components are operational.")
+        return lines
+    statuses = collections.Counter(
+        cachet.COMPONENT_STATUSES.get(component['status'], '?') for component in affected
+    )
+    lines.extend([
+        "Still affected: %d components (%s)" % (len(affected), _counts_line(statuses)),
+        "By group: %s" % _counts_line(_group_counts(affected, group_names)),
+        "Affected: %s" % _names_line(affected, max_names),
+    ])
+    return lines
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
@@ -39,6 +39,9 @@ setup(
         'arrow==0.10',
     ],
     extras_require={
+        'metrics': [
+            'numpy>=1.11',
+        ],
         'dev': [
             'ipython>=6,<7',
         ],
@@ -51,6 +54,7 @@ setup(
             'pylint>=1.6,<2',
             'pytest-pylint>=0.7',
             'pytest-mock>=1.5,<2',
+            'numpy>=1.11',
         ],
     },
     entry_points={
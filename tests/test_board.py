@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""cachcord.board unit tests."""
+
+import unittest.mock
+
+import pytest
+import requests
+
+from cachcord import board as unit
+
+
+@pytest.fixture()
+def webhook():
+    """Returns a mocked DiscordWebhook handing out increasing message ids."""
+
+    fixture = unittest.mock.Mock()
+    fixture.send_message.side_effect = [{'id': str(message_id)} for message_id in range(100)]
+    return fixture
+
+
+@pytest.fixture()
+def components():
+    """Returns a few components spread over two groups."""
+
+    return [
+        {'id': 2, 'name': "TeamSpeak Server", 'group_id': 2, 'order': 1,
+         'status': 1, 'status_name': "Operational"},
+        {'id': 8, 'name': "Member Roster", 'group_id': 1, 'order': 2,
+         'status': 4, 'status_name': "Major Outage"},
+    ]
+
+
+def test_board_rendering(webhook, components):  # pylint: disable=W0621
+    """Asserts that StatusBoard lists components ordered by group and order."""
+
+    status_board = unit.StatusBoard(webhook, dict(), header="Status")
+
+    assert status_board.render(components) == [
+        "Status\n"
+        ":warning: `Member Roster`: Major Outage\n"
+        ":ballot_box_with_check: `TeamSpeak Server`: Operational"
+    ]
+
+
+def test_board_updating(webhook, components):  # pylint: disable=W0621
+    """Asserts that StatusBoard posts once, then only edits messages whose content changed."""
+
+    storage = dict()
+    status_board = unit.StatusBoard(webhook, storage)
+
+    assert status_board.update(components) == 1
+    assert status_board.update(components) == 0
+    assert not webhook.edit_message.called
+
+    components[1]['status'] = 1
+    components[1]['status_name'] = "Operational"
+    assert status_board.update(components) == 1
+    webhook.edit_message.assert_called_with('0', unittest.mock.ANY)
+    assert storage['board']['messages'][0]['content'].endswith("`TeamSpeak Server`: Operational")
+
+
+def test_board_pagination(webhook, components, mocker):  # pylint: disable=W0621
+    """Asserts that StatusBoard spreads over several messages and deletes superfluous ones."""
+
+    mocker.patch('cachcord.board.discord.split_lines',
+                 side_effect=list)
+    storage = dict()
+    status_board = unit.StatusBoard(webhook, storage)
+
+    assert status_board.update(components) == 3
+    assert status_board.update(components[:1]) == 2
+    webhook.delete_message.assert_called_once_with('2')
+    assert [message['id'] for message in storage['board']['messages']] == ['0', '1']
+
+
+def test_board_vanished_message(webhook, components):  # pylint: disable=W0621
+    """Asserts that StatusBoard reposts a board message deleted from the channel."""
+
+    storage = {'board': {'messages': [{'id': '999', 'content': "stale"}]}}
+    status_board = unit.StatusBoard(webhook, storage)
+    response = unittest.mock.Mock(status_code=404)
+    webhook.edit_message.side_effect = requests.HTTPError(response=response)
+
+    status_board.update(components)
+
+    assert storage['board']['messages'][0]['id'] == '0'
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
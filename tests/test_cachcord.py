@@ -3,11 +3,17 @@
 """cachcord unit tests."""
 
 import argparse
+import concurrent.futures
 import logging
 import os
 
+import pytest
+
 import cachcord as unit
+import cachcord.delivery as delivery
+import cachcord.history as history
 import cachcord.persistence as persistence
+import cachcord.settings as settings
 
 from test_cachet import api_components
 
@@ -50,6 +56,192 @@ def test_main_function(mocker, api_components, tmpdir_factory):  # pylint: disab
     unit.discord.DiscordWebhook.send_message.assert_called_with(  # pylint: disable=E1101
         mocker.ANY
     )
+    transitions = list(history.HistoryLog(persist_file_path + '.history').transitions())
+    assert [transition.component_id for transition in transitions] == [last_component['id']]
+
+
+def test_main_resuming(mocker, api_components, tmpdir_factory):  # pylint: disable=W0621
+    """Asserts that an interrupted run is checkpointed and resumed by the next one."""
+
+    mocker.patch('cachcord.LOGGER')
+    mocker.patch('cachcord.discord.DiscordWebhook.send_message', side_effect=RuntimeError)
+    config_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'fixtures',
+                               'cachcord.ini')
+
+    persist_file_path = str(tmpdir_factory.mktemp('data').join('database.pickle3'))
+    with persistence.persistent_storage(persist_file_path) as storage:
+        storage['components'] = {
+            str(component['id']): dict(component, status=4, status_name="Major Outage")
+            for component in api_components[:2]
+        }
+
+    with pytest.raises(RuntimeError):
+        unit.main(config_path, persist_file_path)
+    checkpoint = persistence.Checkpoint(persist_file_path + '.checkpoint').load()
+    assert len([item for item in checkpoint['pending'].values() if item is not None]) == 2
+    assert checkpoint['processed'] == sorted(component['id'] for component in api_components)
+
+    unit.discord.DiscordWebhook.send_message.side_effect = None  # pylint: disable=E1101
+    unit.discord.DiscordWebhook.send_message.reset_mock()  # pylint: disable=E1101
+    unit.main(config_path, persist_file_path)
+
+    assert unit.discord.DiscordWebhook.send_message.call_count == 2  # pylint: disable=E1101
+    assert persistence.Checkpoint(persist_file_path + '.checkpoint').load() is None
+    with persistence.persistent_storage(persist_file_path) as storage:
+        assert storage['components'][str(api_components[0]['id'])]['status'] == 1
+
+
+def test_main_steady(mocker, api_components, tmpdir_factory):  # pylint: disable=W0621
+    """Asserts that no checkpoint is written while no component changes."""
+
+    mocker.patch('cachcord.LOGGER')
+    mocker.patch('cachcord.discord.DiscordWebhook.send_message')
+    mocker.patch('cachcord.persistence.Checkpoint.save')
+    data_dir = tmpdir_factory.mktemp('data')
+    config_file = data_dir.join('cachcord.ini')
+    with open(os.path.join(os.path.abspath(os.path.dirname(__file__)), 'fixtures',
+                           'cachcord.ini'), 'r') as fixture_file:
+        config_file.write(fixture_file.read() + "\n[Checkpoint]\ninterval = 1\n")
+
+    persist_file_path = str(data_dir.join('database.pickle3'))
+    with persistence.persistent_storage(persist_file_path) as storage:
+        storage['components'] = {
+            str(component['id']): component for component in api_components
+        }
+
+    unit.main(config_file.strpath, persist_file_path)
+
+    assert not unit.discord.DiscordWebhook.send_message.called  # pylint: disable=E1101
+    assert not unit.persistence.Checkpoint.save.called  # pylint: disable=E1101
+
+
+def test_main_storm(mocker, api_components, tmpdir_factory):  # pylint: disable=W0621
+    """Asserts that mass changes are summarised instead of being notified one by one."""
+
+    mocker.patch('cachcord.LOGGER')
+    mocker.patch('cachcord.discord.DiscordWebhook.send_message')
+    mocker.patch('cachcord.cachet.component_groups', return_value=dict())
+    data_dir = tmpdir_factory.mktemp('data')
+    config_file = data_dir.join('cachcord.ini')
+    with open(os.path.join(os.path.abspath(os.path.dirname(__file__)), 'fixtures',
+                           'cachcord.ini'), 'r') as fixture_file:
+        config_file.write(fixture_file.read() + "\n[Storm]\nthreshold = 3\n")
+
+    persist_file_path = str(data_dir.join('database.pickle3'))
+    with persistence.persistent_storage(persist_file_path) as storage:
+        storage['components'] = {
+            str(component['id']): dict(component, status=4, status_name="Major Outage")
+            for component in api_components[:3]
+        }
+
+    unit.main(config_file.strpath, persist_file_path)
+
+    assert unit.discord.DiscordWebhook.send_message.call_count == 1  # pylint: disable=E1101
+    message = unit.discord.DiscordWebhook.send_message.call_args[0][0]  # pylint: disable=E1101
+    assert message.startswith("**:rotating_light: Incident storm: 3 components")
+
+
+class _Stop(Exception):
+    pass
+
+
+def test_main_interval(mocker):
+    """Asserts the main function keeps synchronising with reloaded settings when looping."""
+
+    mocker.patch('cachcord.LOGGER')
+    mocker.patch('cachcord.signal.signal')
+    mocker.patch('cachcord.settings.ReloadableSettings')
+    mocker.patch('cachcord.synchronise', side_effect=[RuntimeError, None])
+    mocker.patch('cachcord.time.sleep', side_effect=[None, _Stop])
+
+    with pytest.raises(_Stop):
+        unit.main('config.ini', 'database.pickle3', interval=60)
+
+    assert unit.synchronise.call_count == 2  # pylint: disable=E1101
+    reloadable = unit.settings.ReloadableSettings.return_value  # pylint: disable=E1101
+    unit.synchronise.assert_called_with(  # pylint: disable=E1101
+        reloadable.refresh.return_value,
+        'database.pickle3',
+    )
+    unit.time.sleep.assert_called_with(60)  # pylint: disable=E1101
+
+
+def test_confirm():
+    """Asserts that failed pipelined notifications are queued again."""
+
+    queue = delivery.DeliveryQueue()
+    in_flight = list()
+    for component_id, error in ((1, None), (2, RuntimeError())):
+        future = concurrent.futures.Future()
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+        in_flight.append(({'id': component_id, 'status': 4}, future))
+
+    with pytest.raises(RuntimeError):
+        unit._confirm(queue, in_flight)  # pylint: disable=W0212
+    assert not in_flight
+    assert [component['id'] for _, component in queue.pending()] == [2]
+
+
+def test_format_update_maintenance():
+    """Asserts that changes of components under maintenance are annotated or muted."""
+
+    config = settings.load(os.path.join(
+        os.path.abspath(os.path.dirname(__file__)),
+        'fixtures',
+        'cachcord.ini'
+    ))._replace(maintenance_enabled=True, discord_message_template="{component[name]}")
+    component = {'id': 8, 'name': "Member Roster", 'status_name': "Major Outage"}
+    storage = {'maintenance': {
+        'schedules': {'1': {'id': 1, 'name': "Upgrade"}},
+        'active': {'8': [1]},
+    }}
+
+    assert unit._format_update(  # pylint: disable=W0212
+        config, component, storage) == "Member Roster, under scheduled maintenance Upgrade"
+    assert unit._format_update(  # pylint: disable=W0212
+        config._replace(maintenance_mode='mute'), component, storage) is None
+    assert unit._format_update(  # pylint: disable=W0212
+        config, dict(component, id=9), storage) == "Member Roster"
+
+
+def test_history_command(mocker, capsys, tmpdir_factory):
+    """Asserts the history command prints recorded transitions."""
+
+    mocker.patch('cachcord.PARSER')
+    mocker.patch('cachcord.LOGGER')
+
+    persist_file_path = str(tmpdir_factory.mktemp('data').join('database.pickle3'))
+    with persistence.persistent_storage(persist_file_path) as storage:
+        storage['components'] = {
+            '8': {'id': 8, 'name': "Member Roster"},
+        }
+    log = history.HistoryLog(persist_file_path + '.history')
+    log.append(8, 1, 4, timestamp='2017-05-10T03:23:49+00:00')
+    log.append(8, 4, 1, timestamp='2017-05-11T03:23:49+00:00')
+
+    unit.PARSER.parse_args = mocker.Mock(return_value=argparse.Namespace(
+        command='history',
+        config_path=os.path.join(
+            os.path.abspath(os.path.dirname(__file__)),
+            'fixtures',
+            'cachcord.ini'
+        ),
+        persist_path=persist_file_path,
+        component=8,
+        since='2017-05-11',
+        until=None,
+        debug=False,
+        interval=0,
+    ))
+
+    unit.entry_point()
+    output = capsys.readouterr()[0]
+    assert output == (
+        "2017-05-11T03:23:49+00:00 Member Roster (8): Major Outage -> Operational\n"
+    )
 
 
 #  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
@@ -137,6 +137,247 @@ def test_components_pagination(feed, api_paginated_components):  # pylint: disab
     assert len(list(feed.components)) == len(list(api_paginated_components))
 
 
+@pytest.fixture(scope="function")
+def api_paged_components(mocker):
+    """Fixture mocking Cachet's API endpoint for components, honouring the requested page."""
+
+    components_pages = [
+        _load_from_json('cachet_api_components_pagination_1.json'),
+        _load_from_json('cachet_api_components_pagination_2.json'),
+    ]
+
+    def side_effect(endpoint, params=None):
+        """Serves the requested page."""
+
+        _ = endpoint
+        inner = unittest.mock.Mock()
+        inner.json = unittest.mock.Mock(return_value=components_pages[params['page'] - 1])
+        return inner
+
+    mocker.patch('cachcord.cachet.CachetAPI.get', side_effect=side_effect)
+
+    return components_pages
+
+
+def test_components_resuming(api, api_paged_components):  # pylint: disable=W0621
+    """Asserts that CachetComponentUpdateFeed resumes from a position, skipping processed ones."""
+
+    update_feed = unit.CachetComponentUpdateFeed(
+        api=api,
+        storage=dict(),
+        position={'page': 2, 'processed': [5]},
+    )
+
+    assert [component['id'] for component in update_feed.components] == [3, 8]
+    assert unit.CachetAPI.get.call_count == 1  # pylint: disable=E1101
+    assert update_feed.take_changes() == dict()
+    _ = api_paged_components
+
+
+def test_components_checkpointing(api, api_paged_components):  # pylint: disable=W0621
+    """Asserts that CachetComponentUpdateFeed calls its checkpoint at the configured interval."""
+
+    positions = list()
+    feed_storage = {'components': {
+        str(component['id']): dict(component, status=2)
+        for component in api_paged_components[0]['data']
+    }}
+    update_feed = unit.CachetComponentUpdateFeed(
+        api=api,
+        storage=feed_storage,
+        checkpoint=lambda: positions.append(
+            dict(update_feed.position(), components=update_feed.take_changes())),
+        checkpoint_interval=3,
+    )
+
+    assert len(list(update_feed.updates)) == 5
+    assert [(position['page'], position['processed']) for position in positions] == [
+        (1, [2, 4, 7]),
+        (2, [5]),
+    ]
+    assert [sorted(position['components']) for position in positions] == [
+        ['2', '4', '7'],
+        ['1', '5', '6'],
+    ]
+    assert update_feed.position() == {'page': 2, 'processed': [3, 5, 8]}
+    assert sorted(update_feed.take_changes()) == ['3', '8']
+    assert update_feed.take_changes() == dict()
+
+
+def test_components_filtered_polling(mocker, api):  # pylint: disable=W0621
+    """Asserts that CachetComponentUpdateFeed polls non-operational components between sweeps."""
+
+    components = _load_from_json('cachet_api_components.json')
+
+    def side_effect(endpoint, params=None):
+        """Filters components on the requested status."""
+
+        _ = endpoint
+        data = [component for component in components['data']
+                if 'status' not in params or component['status'] == params['status']]
+        inner = unittest.mock.Mock()
+        inner.json = unittest.mock.Mock(return_value={'meta': components['meta'], 'data': data})
+        return inner
+
+    mocker.patch('cachcord.cachet.CachetAPI.get', side_effect=side_effect)
+    recovered = dict(components['data'][0], id=42, status=3, status_name="Partial Outage")
+    feed_storage = {'components': {'42': recovered}}
+    update_feed = unit.CachetComponentUpdateFeed(api=api, storage=feed_storage,
+                                                 full_sweep_interval=3600)
+
+    assert update_feed.full_sweep_due
+    assert len(list(update_feed.components)) == len(components['data'])
+    assert 'last_full_sweep' in feed_storage
+
+    update_feed = unit.CachetComponentUpdateFeed(api=api, storage=feed_storage,
+                                                 full_sweep_interval=3600)
+    assert not update_feed.full_sweep_due
+    unit.CachetAPI.get.reset_mock()  # pylint: disable=E1101
+    updates = list(update_feed.updates)
+
+    calls = unit.CachetAPI.get.call_args_list  # pylint: disable=E1101
+    assert [call[1]['params']['status'] for call in calls] == [0, 2, 3, 4]
+    assert [(component['id'], component['status']) for component in updates] == [(42, 1)]
+    assert feed_storage['components']['42']['status_name'] == "Operational"
+
+    feed_storage['last_full_sweep'] = feed_storage['last_full_sweep'] - 3600
+    assert update_feed.full_sweep_due
+
+
+class IncidentsAPI(object):
+    """Mocks Cachet's incidents endpoints, serving pages sorted by descending update date.
+
+    Schedules are served from the same items.
+    """
+
+    def __init__(self):
+        self.incidents = list()
+        self.updates = dict()
+        self.requests = list()
+
+    def add(self, incident_id, updated_at, status=1, component_id=8):
+        """Creates or updates an incident."""
+
+        self.incidents = [incident for incident in self.incidents
+                          if incident['id'] != incident_id]
+        self.incidents.append({'id': incident_id, 'name': "Incident %d" % incident_id,
+                               'status': status, 'human_status': "Investigating",
+                               'component_id': component_id, 'updated_at': updated_at})
+
+    def get(self, endpoint, params=None):
+        """Routes incident and incident update listings."""
+
+        self.requests.append(endpoint)
+        if endpoint in ('/incidents', '/schedules'):
+            items = sorted(self.incidents, key=lambda incident: incident['updated_at'],
+                           reverse=True)
+        else:
+            incident_id = int(endpoint.split('/')[2])
+            items = sorted(self.updates.get(incident_id, list()),
+                           key=lambda update: update['id'], reverse=True)
+        per_page = params.get('per_page', 2)
+        start = (params['page'] - 1) * per_page
+        inner = unittest.mock.Mock()
+        inner.json = unittest.mock.Mock(return_value={
+            'meta': {'pagination': {'total_pages': max(-(-len(items) // per_page), 1)}},
+            'data': items[start:start + per_page],
+        })
+        return inner
+
+    def pages(self, *args, **kwargs):
+        """Reuses the actual CachetAPI pagination over the mocked get."""
+
+        return unit.CachetAPI.pages(self, *args, **kwargs)
+
+
+def _incidents_api():
+    mocked_api = IncidentsAPI()
+    for incident_id in range(1, 6):
+        mocked_api.add(incident_id, '2017-05-0%d 00:00:00' % incident_id)
+    return mocked_api
+
+
+def _change_incidents(mocked_api):
+    mocked_api.add(6, '2017-05-06 00:00:00')
+    mocked_api.add(4, '2017-05-07 00:00:00')
+    mocked_api.updates[4] = [
+        {'id': 1, 'human_status': "Investigating", 'created_at': '2017-05-04 00:00:00'},
+        {'id': 2, 'human_status': "Identified", 'created_at': '2017-05-07 00:00:00'},
+    ]
+    mocked_api.add(3, '2017-05-07 00:00:00', status=unit.INCIDENT_FIXED)
+
+
+def _event_kinds(events):
+    return [(event.kind, event.incident['id']) for event in events]
+
+
+def test_incidents_feed():
+    """Asserts that CachetIncidentFeed yields incident events incrementally."""
+
+    mocked_api = _incidents_api()
+    incident_feed = unit.CachetIncidentFeed(mocked_api, dict(), per_page=3)
+
+    assert not list(incident_feed.events)
+    assert mocked_api.requests == ['/incidents', '/incidents']
+    assert incident_feed.component_incident(8)['id'] == 5
+
+    _change_incidents(mocked_api)
+    mocked_api.requests = list()
+    events = list(incident_feed.events)
+
+    assert _event_kinds(events) == [('new', 6), ('edit', 3), ('update', 4)]
+    assert events[-1].update['id'] == 2
+    assert mocked_api.requests.count('/incidents') == 2
+    assert incident_feed.component_incident(8)['id'] == 4
+
+    mocked_api.requests = list()
+    assert not list(incident_feed.events)
+    assert mocked_api.requests == ['/incidents']
+
+    mocked_api.add(4, '2017-05-08 00:00:00', status=unit.INCIDENT_FIXED)
+    assert _event_kinds(incident_feed.events) == [('edit', 4)]
+    assert incident_feed.component_incident(8) is None
+
+
+def test_incidents_feed_interrupted():
+    """Asserts that CachetIncidentFeed resumes after the last event that went through."""
+
+    mocked_api = _incidents_api()
+    incident_feed = unit.CachetIncidentFeed(mocked_api, dict(), per_page=3)
+    assert not list(incident_feed.events)
+
+    _change_incidents(mocked_api)
+    events = incident_feed.events
+    # Sending the second event fails
+    assert _event_kinds([next(events), next(events)]) == [('new', 6), ('edit', 3)]
+    events.close()
+
+    assert _event_kinds(incident_feed.events) == [('edit', 3), ('update', 4)]
+
+
+def test_schedules_feed():
+    """Asserts that CachetScheduleFeed yields every schedule, then only updated ones."""
+
+    mocked_api = IncidentsAPI()
+    for schedule_id in range(1, 4):
+        mocked_api.add(schedule_id, '2017-05-0%d 00:00:00' % schedule_id)
+    schedule_feed = unit.CachetScheduleFeed(mocked_api, dict(), per_page=2)
+
+    assert [schedule['id'] for schedule in schedule_feed.changes] == [1, 2, 3]
+    mocked_api.add(1, '2017-05-04 00:00:00')
+    mocked_api.requests = list()
+    assert [schedule['id'] for schedule in schedule_feed.changes] == [1]
+    assert mocked_api.requests == ['/schedules', '/schedules']
+
+    mocked_api.add(2, '2017-05-05 00:00:00')
+    mocked_api.add(3, '2017-05-06 00:00:00')
+    changes = schedule_feed.changes
+    # Handling the second schedule fails
+    assert [next(changes)['id'], next(changes)['id']] == [2, 3]
+    changes.close()
+    assert [schedule['id'] for schedule in schedule_feed.changes] == [3]
+
+
 @pytest.fixture(scope="function", params=_load_from_json('cachet_api_components.json')['data'])
 def api_component(mocker, request):
     """Fixture providing a single Cachet component."""
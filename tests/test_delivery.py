@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""cachcord.delivery unit tests."""
+
+import pytest
+
+from cachcord import delivery as unit
+
+
+def _component(component_id, status, group_id=1):
+    return {'id': component_id, 'status': status, 'group_id': group_id}
+
+
+def _drain(queue):
+    components = list()
+    while queue:
+        components.append(queue.pop())
+    return components
+
+
+def test_queue_severity():
+    """Asserts that DeliveryQueue delivers outages before recoveries, oldest first."""
+
+    queue = unit.DeliveryQueue()
+    queue.push(_component(1, 1), timestamp=10)
+    queue.push(_component(2, 4), timestamp=30)
+    queue.push(_component(3, 2), timestamp=20)
+    queue.push(_component(4, 4), timestamp=20)
+
+    assert [component['id'] for component in _drain(queue)] == [4, 2, 3, 1]
+
+
+def test_queue_change_date():
+    """Asserts that DeliveryQueue orders notifications by component update date by default."""
+
+    queue = unit.DeliveryQueue()
+    for component_id, updated_at in ((1, '2017-05-10 03:23:49'), (2, '2017-05-09 03:23:49')):
+        queue.push(dict(_component(component_id, 4), updated_at=updated_at))
+
+    assert [component['id'] for component in _drain(queue)] == [2, 1]
+
+
+def test_queue_group_importance():
+    """Asserts that DeliveryQueue favours important groups within a severity."""
+
+    queue = unit.DeliveryQueue(group_importance={2: 10})
+    queue.push(_component(1, 4, group_id=1), timestamp=10)
+    queue.push(_component(2, 4, group_id=2), timestamp=20)
+    queue.push(_component(3, 3, group_id=2), timestamp=5)
+
+    assert [component['id'] for component in _drain(queue)] == [2, 1, 3]
+
+
+def test_queue_superseding():
+    """Asserts that DeliveryQueue drops notifications superseded by a newer one."""
+
+    queue = unit.DeliveryQueue()
+    queue.push(_component(1, 4), timestamp=10)
+    queue.push(_component(2, 3), timestamp=10)
+    queue.push(_component(1, 1), timestamp=20)
+
+    assert len(queue) == 2
+    assert sorted(queue.pending(), key=lambda item: item[1]['id']) == [
+        (20, _component(1, 1)),
+        (10, _component(2, 3)),
+    ]
+    assert _drain(queue) == [_component(2, 3), _component(1, 1)]
+    with pytest.raises(IndexError):
+        queue.pop()
+
+
+def test_queue_changes():
+    """Asserts that DeliveryQueue tracks the notifications changed since last taken."""
+
+    queue = unit.DeliveryQueue()
+    queue.push(_component(1, 4), timestamp=10)
+    queue.push(_component(2, 3), timestamp=10)
+    assert queue.take_changes() == {1: (10, _component(1, 4)), 2: (10, _component(2, 3))}
+    assert queue.take_changes() == dict()
+
+    queue.pop()
+    queue.push(_component(3, 4), timestamp=20)
+    assert queue.take_changes() == {1: None, 3: (20, _component(3, 4))}
+    queue.clear()
+    assert queue.take_changes() == {2: None, 3: None}
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
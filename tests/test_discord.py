@@ -78,6 +78,22 @@ def test_webhook_message_sending(mocker, webhook):  # pylint: disable=W0621
     )
 
 
+def test_webhook_message_editing(mocker, webhook):  # pylint: disable=W0621
+    """Asserts that DiscordWebhook edits and deletes messages through their own endpoint."""
+
+    mocker.patch('requests.patch')
+    mocker.patch('requests.delete')
+
+    webhook.edit_message('42', "test_webhook_message_editing")
+    webhook.delete_message('42')
+
+    requests.patch.assert_called_with(  # pylint:disable=E1101
+        webhook.url + '/messages/42',
+        json={'content': "test_webhook_message_editing"},
+    )
+    requests.delete.assert_called_with(webhook.url + '/messages/42')  # pylint:disable=E1101
+
+
 def _side_effects_gen(side_effects):
     for func, arg, kwargs in side_effects:
         yield func(*arg, **kwargs)
@@ -219,4 +235,62 @@ def test_webhook_buffering(mocker, webhook):  # pylint: disable=W0621
     assert requests.post.call_count == 2  # pylint:disable=E1101
 
 
+def _pipelined_response(mocker, status_code=200):
+    response = _generate_response(mocker)
+    response.status_code = status_code
+    if status_code >= 500:
+        response.headers = dict()
+    if status_code >= 400:
+        error = requests.HTTPError(response=response)
+        response.raise_for_status = mocker.Mock(side_effect=error)
+    return response
+
+
+def test_webhook_pipelining(mocker, webhook):  # pylint: disable=W0621
+    """Asserts that DiscordWebhook pipelines unconfirmed messages over a session, retrying them."""
+
+    mocker.patch('time.sleep')
+    post = mocker.patch('requests.Session.post', side_effect=[
+        _pipelined_response(mocker, 502),
+        _pipelined_response(mocker),
+        _pipelined_response(mocker, 400),
+    ])
+    webhook.pipeline = 1
+
+    assert webhook.send_message("test_webhook_pipelining", wait=False).result() is None
+    post.assert_called_with(ANY, data={'content': "test_webhook_pipelining"})
+    assert post.call_count == 2
+    with pytest.raises(requests.HTTPError):
+        webhook.send_message("test_webhook_pipelining", wait=False).result()
+    assert post.call_count == 3
+
+    webhook.close()
+    assert webhook._executor is None  # pylint: disable=W0212
+
+
+def test_webhook_fractional_reset(mocker, webhook):  # pylint: disable=W0621
+    """Asserts that DiscordWebhook accepts Discord's fractional rate limit headers."""
+
+    response = _generate_response(mocker)
+    response.headers['X-RateLimit-Remaining'] = '0'
+    response.headers['X-RateLimit-Reset'] = '1470173023.123'
+    mocker.patch('requests.post', return_value=response)
+
+    webhook.send_message("test_webhook_fractional_reset")
+
+    assert webhook.rate_exhausted
+    assert webhook.next_reset == 1470173023.123
+
+
+def test_split_lines():
+    """Asserts that split_lines groups lines into messages under the length limit."""
+
+    assert unit.split_lines(["a" * 4, "b" * 4, "c" * 9, "d" * 12], max_length=10) == [
+        "aaaa\nbbbb",
+        "c" * 9,
+        "d" * 10,
+    ]
+    assert not unit.split_lines([])
+
+
 #  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
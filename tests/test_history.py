@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""cachcord.history unit tests."""
+
+import os
+
+import pytest
+
+from cachcord import history as unit
+
+
+@pytest.fixture()
+def history_log(tmpdir_factory):
+    """Returns a HistoryLog instance populated with transitions of two components."""
+
+    log = unit.HistoryLog(str(tmpdir_factory.mktemp('data').join('history')))
+    log.append(8, 1, 4, timestamp=1000)
+    log.append(4, 1, 3, timestamp=1010)
+    log.append(8, 4, 1, timestamp=1020)
+    log.append(4, 3, 1, timestamp=1030)
+    log.append(8, 1, 2, timestamp=1040)
+    return log
+
+
+def test_history_empty(tmpdir_factory):
+    """Asserts that an empty HistoryLog yields no transitions."""
+
+    log = unit.HistoryLog(str(tmpdir_factory.mktemp('data').join('history')))
+
+    assert not list(log.transitions())
+    assert not list(log.transitions(component_id=8))
+
+
+def test_history_all_components(history_log):  # pylint: disable=W0621
+    """Asserts that HistoryLog returns every transition in chronological order."""
+
+    transitions = list(history_log.transitions())
+
+    assert [transition.timestamp for transition in transitions] == [1000, 1010, 1020, 1030, 1040]
+    assert transitions[0] == unit.Transition(1000, 8, 1, 4)
+
+
+def test_history_time_range(history_log):  # pylint: disable=W0621
+    """Asserts that HistoryLog restricts transitions to an inclusive time range."""
+
+    transitions = list(history_log.transitions(since=1010, until=1030))
+
+    assert [transition.timestamp for transition in transitions] == [1010, 1020, 1030]
+
+
+def test_history_component(history_log):  # pylint: disable=W0621
+    """Asserts that HistoryLog filters transitions of a single component through its index."""
+
+    transitions = list(history_log.transitions(component_id=8, since=1001))
+
+    assert transitions == [unit.Transition(1020, 8, 4, 1), unit.Transition(1040, 8, 1, 2)]
+    assert not list(history_log.transitions(component_id=42))
+
+
+def test_history_incremental(history_log):  # pylint: disable=W0621
+    """Asserts that HistoryLog can be followed from a given record number."""
+
+    transitions = list(history_log.transitions_from(3))
+
+    assert transitions == [unit.Transition(1030, 4, 3, 1), unit.Transition(1040, 8, 1, 2)]
+    assert not list(history_log.transitions_from(5))
+
+
+def test_history_ordering(history_log):  # pylint: disable=W0621
+    """Asserts that out-of-order transitions are clamped to keep the log sorted."""
+
+    transition = history_log.append(4, 1, 4, timestamp=900)
+
+    assert transition.timestamp == 1040
+
+
+def test_history_repair(history_log):  # pylint: disable=W0621
+    """Asserts that a partially written trailing record is ignored by readers, then discarded."""
+
+    with open(history_log.log_path, 'ab') as log_file:
+        log_file.write(b'\x00' * (unit.RECORD.size // 2))
+
+    log = unit.HistoryLog(history_log.path)
+
+    assert len(list(log.transitions(component_id=8))) == 3
+    assert len(list(log.transitions_from(0))) == 5
+    assert os.path.getsize(log.log_path) == 5 * unit.RECORD.size + unit.RECORD.size // 2
+
+    assert log.append(4, 1, 4, timestamp=900).timestamp == 1040
+    assert os.path.getsize(log.log_path) == 6 * unit.RECORD.size
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""cachcord.maintenance unit tests."""
+
+import arrow
+
+from cachcord import maintenance as unit
+
+HOUR = 3600
+
+
+def _schedule(schedule_id=1, starts=10 * HOUR, ends=12 * HOUR, status=0, components=(8,)):
+    return {
+        'id': schedule_id,
+        'name': "Maintenance %d" % schedule_id,
+        'message': "",
+        'status': status,
+        'scheduled_at': arrow.get(starts).format('YYYY-MM-DD HH:mm:ss'),
+        'completed_at': arrow.get(ends).format('YYYY-MM-DD HH:mm:ss') if ends else None,
+        'components': [{'component_id': component_id} for component_id in components],
+    }
+
+
+def _kinds(events):
+    return [(event.kind, event.schedule['id'], event.offset) for event in events]
+
+
+def test_wheel_advance():
+    """Asserts that TimerWheel returns due timers in order and keeps later rotations."""
+
+    wheel = unit.TimerWheel(dict(), resolution=60, size=10)
+    assert not list(wheel.advance(0))
+    wheel.add(630, 'later')
+    wheel.add(90, 'second')
+    wheel.add(30, 'first')
+
+    assert list(wheel.advance(100)) == [(30, 'first'), (90, 'second')]
+    assert not list(wheel.advance(200))
+    assert wheel.data['slots'] == {0: [(630, 'later')]}
+    assert list(wheel.advance(10000)) == [(630, 'later')]
+    assert wheel.data['slots'] == dict()
+
+
+def test_windows_reminders():
+    """Asserts that MaintenanceWindows fires reminders, start and completion of a window."""
+
+    storage = dict()
+    windows = unit.MaintenanceWindows(storage, reminders=(2 * HOUR, HOUR))
+    list(windows.advance(arrow.get(0)))
+    list(windows.index(_schedule(), arrow.get(0)))
+
+    assert _kinds(windows.advance(arrow.get(9 * HOUR))) == [
+        ('reminder', 1, 2 * HOUR),
+        ('reminder', 1, HOUR),
+    ]
+    assert unit.active_schedule(storage, 8) is None
+    assert _kinds(windows.advance(arrow.get(10 * HOUR))) == [('started', 1, None)]
+    assert unit.active_schedule(storage, 8)['name'] == "Maintenance 1"
+    assert _kinds(windows.advance(arrow.get(13 * HOUR))) == [('completed', 1, None)]
+    assert unit.active_schedule(storage, 8) is None
+
+
+def test_windows_updates():
+    """Asserts that updated schedules supersede their pending timers."""
+
+    storage = dict()
+    windows = unit.MaintenanceWindows(storage, reminders=(HOUR,))
+    list(windows.advance(arrow.get(0)))
+    list(windows.index(_schedule(), arrow.get(0)))
+    list(windows.index(_schedule(starts=20 * HOUR, ends=None), arrow.get(HOUR)))
+
+    assert _kinds(windows.advance(arrow.get(12 * HOUR))) == list()
+    assert _kinds(windows.advance(arrow.get(20 * HOUR))) == [
+        ('reminder', 1, HOUR),
+        ('started', 1, None),
+    ]
+    assert _kinds(windows.index(_schedule(status=2, ends=None), arrow.get(21 * HOUR))) == [
+        ('completed', 1, None),
+    ]
+    assert unit.active_schedule(storage, 8) is None
+
+
+def test_windows_first_run():
+    """Asserts that windows already started on the first run are applied silently."""
+
+    storage = dict()
+    windows = unit.MaintenanceWindows(storage)
+    now = arrow.get(11 * HOUR)
+
+    assert not _kinds(windows.index(_schedule(components=(8, 9)), now))
+    assert not _kinds(windows.advance(now))
+    assert unit.active_schedule(storage, 9)['id'] == 1
+    assert _kinds(windows.advance(arrow.get(12 * HOUR))) == [('completed', 1, None)]
+
+
+def test_windows_interrupted():
+    """Asserts that events are yielded again until the ones before them went through."""
+
+    storage = dict()
+    windows = unit.MaintenanceWindows(storage, reminders=(HOUR,))
+    list(windows.advance(arrow.get(0)))
+    list(windows.index(_schedule(), arrow.get(0)))
+
+    events = windows.advance(arrow.get(10 * HOUR))
+    # Posting the start fails
+    assert _kinds([next(events), next(events)]) == [('reminder', 1, HOUR), ('started', 1, None)]
+    events.close()
+    assert unit.active_schedule(storage, 8) is None
+
+    assert _kinds(windows.advance(arrow.get(10 * HOUR))) == [('started', 1, None)]
+    assert unit.active_schedule(storage, 8)['id'] == 1
+
+    events = windows.index(_schedule(status=2), arrow.get(11 * HOUR))
+    assert _kinds([next(events)]) == [('completed', 1, None)]
+    events.close()
+    assert _kinds(windows.index(_schedule(status=2), arrow.get(11 * HOUR))) == [
+        ('completed', 1, None),
+    ]
+    assert unit.active_schedule(storage, 8) is None
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
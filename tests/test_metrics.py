@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""cachcord.metrics unit tests."""
+
+import re
+import unittest.mock
+
+import pytest
+
+from cachcord import cachet
+from cachcord import metrics as unit
+
+numpy = pytest.importorskip('numpy')
+
+
+def _points_page(points, page, total_pages):
+    return {
+        'meta': {'pagination': {'current_page': page, 'total_pages': total_pages}},
+        'data': points,
+    }
+
+
+def _point(point_id, value):
+    return {
+        'id': point_id,
+        'value': value,
+        'created_at': '2017-05-08 01:%02d:00' % point_id,
+    }
+
+
+class PointsAPI(object):
+    """Mocks the Cachet metric points endpoint, serving pages of per_page points."""
+
+    def __init__(self, points, per_page=2):
+        self.points = points
+        self.per_page = per_page
+        self.requested_pages = list()
+
+    def get(self, endpoint, params=None):
+        """Routes points and metric details requests."""
+
+        response = unittest.mock.Mock()
+        if re.match(r'/metrics/\d+/points', endpoint):
+            self.requested_pages.append(params['page'])
+            total_pages = max(-(-len(self.points) // self.per_page), 1)
+            start = (params['page'] - 1) * self.per_page
+            response.json.return_value = _points_page(
+                self.points[start:start + self.per_page], params['page'], total_pages,
+            )
+        else:
+            response.json.return_value = {'data': {'id': 1, 'name': "Latency", 'suffix': "ms"}}
+        return response
+
+    def pages(self, *args, **kwargs):
+        """Reuses the actual CachetAPI pagination over the mocked get."""
+
+        return cachet.CachetAPI.pages(self, *args, **kwargs)
+
+
+def test_evaluate_threshold():
+    """Asserts that threshold rules compare each point to the limit."""
+
+    rule = unit.MetricRule(1, 'below', 2.0, 1)
+    _, mask = unit.evaluate(rule, numpy.arange(4.0), numpy.array([3.0, 1.0, 2.0, 0.5]))
+
+    assert mask.tolist() == [False, True, False, True]
+
+
+def test_evaluate_rate():
+    """Asserts that rate rules compare the per-minute change between consecutive points."""
+
+    rule = unit.MetricRule(1, 'rate_above', 5.0, 1)
+    series, mask = unit.evaluate(rule, numpy.array([0.0, 60.0, 120.0]),
+                                 numpy.array([10.0, 20.0, 22.0]))
+
+    assert numpy.isnan(series[0])
+    assert series[1:].tolist() == [10.0, 2.0]
+    assert mask.tolist() == [False, True, False]
+
+
+def test_evaluate_rolling_mean():
+    """Asserts that rolling mean rules only evaluate points with a full window."""
+
+    rule = unit.MetricRule(1, 'mean_above', 2.0, 3)
+    series, mask = unit.evaluate(rule, numpy.arange(5.0), numpy.array([1.0, 2.0, 3.0, 4.0, 0.0]))
+
+    assert series[2:].tolist() == [2.0, 3.0, 7.0 / 3]
+    assert mask.tolist() == [False, False, False, True, True]
+
+
+def test_points_incremental():
+    """Asserts that CachetMetricFeed only fetches points created since the last call."""
+
+    api = PointsAPI([_point(point_id, 1.0) for point_id in range(1, 6)])
+    feed = unit.CachetMetricFeed(api, dict())
+
+    _, values = feed.points(1)
+    assert not len(values)  # pylint: disable=C1801
+    assert api.requested_pages == [1, 3]
+    assert feed.storage['metrics']['1']['tail'] == [[1494205500.0, 1.0]]
+
+    api.points.extend(_point(point_id, 1.0) for point_id in range(6, 9))
+    api.requested_pages = list()
+    timestamps, values = feed.points(1)
+    assert api.requested_pages == [3, 4]
+    assert len(values) == 3
+    assert timestamps[1] - timestamps[0] == 60
+
+    api.requested_pages = list()
+    assert not len(feed.points(1)[1])  # pylint: disable=C1801
+    assert api.requested_pages == [4]
+
+
+def test_check_alerts():
+    """Asserts that CachetMetricFeed raises one alert per breach and one per recovery."""
+
+    api = PointsAPI([_point(1, 1.0)])
+    feed = unit.CachetMetricFeed(api, dict())
+    rules = [
+        unit.MetricRule(1, 'above', 5.0, 1),
+        unit.MetricRule(1, 'mean_above', 4.0, 2),
+    ]
+    assert not feed.check(rules)
+
+    api.points.extend([_point(2, 9.0), _point(3, 1.0), _point(4, 7.0), _point(5, 8.0)])
+    alerts = feed.check(rules)
+
+    assert [(alert.rule.kind, alert.value, alert.count, alert.recovered)
+            for alert in alerts] == [('above', 9.0, 3, False), ('mean_above', 7.5, 3, False)]
+
+    api.points.append(_point(6, 0.0))
+    alerts = feed.check(rules)
+
+    assert [(alert.rule.kind, alert.recovered) for alert in alerts] == [
+        ('above', True),
+        ('mean_above', True),
+    ]
+    assert feed.metric(1)['name'] == "Latency"
+
+
+def test_describe_rule():
+    """Asserts that rules are described in plain words."""
+
+    assert unit.describe_rule(unit.MetricRule(1, 'above', 5.0, 1)) == 'above 5'
+    assert unit.describe_rule(unit.MetricRule(1, 'rate_above', 2.5, 1)) == \
+        'changing faster than 2.5/min'
+    assert unit.describe_rule(unit.MetricRule(1, 'mean_below', 3, 4)) == '4-point mean below 3'
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
@@ -3,6 +3,7 @@
 """cachcord.persistence unit tests."""
 
 import os
+import pickle
 import stat
 
 import pytest
@@ -36,4 +37,32 @@ def test_persistence(tmpdir_factory):
         assert storage["test_key"] == persisted_value
 
 
+def test_checkpoint(tmpdir_factory):
+    """Asserts that checkpoints can be appended, merged, loaded and cleared."""
+
+    checkpoint = unit.Checkpoint(str(tmpdir_factory.mktemp('data').join('run.checkpoint')))
+
+    assert checkpoint.load() is None
+    checkpoint.save({'page': 1, 'components': {'1': 'a', '2': 'b'}})
+    checkpoint.save({'page': 2, 'components': {'2': 'c'}})
+    assert checkpoint.load() == {'page': 2, 'components': {'1': 'a', '2': 'c'}}
+    assert os.listdir(os.path.dirname(checkpoint.file_path)) == ['run.checkpoint']
+    checkpoint.clear()
+    checkpoint.clear()
+    assert checkpoint.load() is None
+
+
+def test_checkpoint_interrupted(tmpdir_factory):
+    """Asserts that a checkpoint record left incomplete is dropped."""
+
+    checkpoint = unit.Checkpoint(str(tmpdir_factory.mktemp('data').join('run.checkpoint')))
+
+    checkpoint.save({'page': 1})
+    with open(checkpoint.file_path, 'ab') as checkpoint_file:
+        checkpoint_file.write(pickle.dumps({'page': 2})[:-3])
+    assert checkpoint.load() == {'page': 1}
+    checkpoint.save({'page': 3})
+    assert checkpoint.load() == {'page': 3}
+
+
 #  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
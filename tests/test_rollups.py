@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""cachcord.rollups unit tests."""
+
+import arrow
+import pytest
+
+from cachcord import history
+from cachcord import rollups as unit
+
+DAY = 86400
+
+
+@pytest.fixture()
+def history_log(tmpdir_factory):
+    """Returns an empty HistoryLog."""
+
+    return history.HistoryLog(str(tmpdir_factory.mktemp('data').join('history')))
+
+
+@pytest.fixture()
+def component_rollups(history_log):  # pylint: disable=W0621
+    """Returns ComponentRollups started at 0, with an incident of component 8 on the second day."""
+
+    fixture = unit.ComponentRollups(dict())
+    fixture.update(history_log, now=arrow.get(0))
+    history_log.append(8, 1, 4, timestamp=DAY + 3600)
+    history_log.append(8, 4, 1, timestamp=DAY + 3 * 3600)
+    fixture.update(history_log)
+    return fixture
+
+
+def test_rollups_incremental(history_log, component_rollups):  # pylint: disable=W0621
+    """Asserts that ComponentRollups only consumes transitions recorded since the last update."""
+
+    assert component_rollups.update(history_log) == 0
+    history_log.append(8, 1, 2, timestamp=2 * DAY)
+    assert component_rollups.update(history_log) == 1
+    assert component_rollups.data['cursor'] == 3
+
+
+def test_rollups_started(history_log):  # pylint: disable=W0621
+    """Asserts that transitions recorded before the rollups were created are skipped."""
+
+    history_log.append(8, 1, 4, timestamp=0)
+    started = unit.ComponentRollups(dict())
+
+    assert started.update(history_log, now=arrow.get(DAY)) == 0
+    assert started.data['started'] == DAY
+    assert not started.data['spans']
+
+
+def test_rollups_spans(component_rollups):  # pylint: disable=W0621
+    """Asserts that transitions are recorded as spans starting when tracking started."""
+
+    assert component_rollups.data['spans']['8'] == [
+        (0, 1),
+        (DAY + 3600, 4),
+        (DAY + 3 * 3600, 1),
+    ]
+
+
+def test_rollups_retention(component_rollups, history_log):  # pylint: disable=W0621
+    """Asserts that spans older than retention are pruned, but for the one covering it."""
+
+    component_rollups.retention = DAY
+    history_log.append(8, 1, 2, timestamp=3 * DAY)
+    component_rollups.update(history_log)
+
+    assert component_rollups.data['spans']['8'] == [(DAY + 3 * 3600, 1), (3 * DAY, 2)]
+
+
+def test_rollups_summary(component_rollups):  # pylint: disable=W0621
+    """Asserts that summaries include the ongoing span and untracked components."""
+
+    result = component_rollups.summary(8, DAY, 3 * DAY)
+
+    assert result['statuses'] == {1: 2 * DAY - 2 * 3600, 4: 2 * 3600}
+    assert result['incidents'] == 1
+    assert result['recovery_time'] == 2 * 3600
+    assert component_rollups.summary(4, 0, DAY, current_status=3)['statuses'] == {3: DAY}
+
+
+def test_rollups_digest(component_rollups):  # pylint: disable=W0621
+    """Asserts that digests are scheduled and report availability per component."""
+
+    components = [{'id': 8, 'name': "Member Roster", 'status': 1}]
+
+    assert not component_rollups.digest_due(2 * DAY, now=arrow.get(DAY))
+    assert not component_rollups.digest_due(2 * DAY, now=arrow.get(2 * DAY))
+    assert component_rollups.digest_due(2 * DAY, now=arrow.get(3 * DAY))
+
+    lines = component_rollups.digest(components, 2 * DAY, now=arrow.get(3 * DAY + 60))
+
+    assert lines == [
+        "`Member Roster`: 95.83% available, 1 incident(s), MTTR 2h 00m, currently Operational",
+    ]
+    assert not component_rollups.digest_due(2 * DAY, now=arrow.get(4 * DAY))
+
+
+def test_rollups_first_transition(history_log):  # pylint: disable=W0621
+    """Asserts that components count in their previous status until their first transition."""
+
+    first = unit.ComponentRollups(dict())
+    first.update(history_log, now=arrow.get(0))
+    history_log.append(8, 1, 4, timestamp=7 * DAY - 3600)
+    first.update(history_log)
+
+    components = [{'id': 8, 'name': "Member Roster", 'status': 4}]
+    assert first.digest(components, 7 * DAY, now=arrow.get(7 * DAY)) == [
+        "`Member Roster`: 99.40% available, 1 incident(s), MTTR n/a, currently Major Outage",
+    ]
+
+
+def test_format_duration():
+    """Asserts that durations are formatted with their two most significant units."""
+
+    assert unit.format_duration(59) == '0m'
+    assert unit.format_duration(3 * 3600 + 60) == '3h 01m'
+    assert unit.format_duration(2 * DAY + 3600) == '2d 01h'
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
@@ -2,6 +2,8 @@
 
 """cachcord.settings unit tests."""
 
+import os
+
 import pytest
 
 from cachcord import settings as unit
@@ -40,4 +42,120 @@ def test_configurator_fetching(config_file):  # pylint: disable=W0621
     config_parser.read(config_file)
     assert config_parser.get('TestSection', 'key') == "value"
 
+
+FIXTURE_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'fixtures', 'cachcord.ini')
+
+
+@pytest.fixture()
+def cachcord_config_file(tmpdir_factory):
+    """Fixture that copies the cachcord configuration fixture to a writable location."""
+
+    tmpfile = tmpdir_factory.mktemp('data').join('cachcord.ini')
+    with open(FIXTURE_PATH, 'r') as fixture_file:
+        tmpfile.write(fixture_file.read())
+    return tmpfile
+
+
+def test_settings_loading():
+    """Asserts that load returns typed settings with defaults for optional sections."""
+
+    config = unit.load(FIXTURE_PATH)
+
+    assert config.cachet_api_url == "http://status.domain.tld/api/v1"
+    assert config.board_enabled is False
+    assert config.digest_period == 7 * 86400
+    assert config.history_path is None
+    with pytest.raises(AttributeError):
+        config.board_enabled = True
+
+
+@pytest.mark.parametrize('content', [
+    "",
+    "[Cachet]\napi_url = http://dummy.tld\n",
+    "[Cachet\n",
+    "[Cachet]\napi_url = a\napi_token = a\n[Discord]\nwebhook_url = a\n"
+    "message_template = {unknown}\n",
+    "[Cachet]\napi_url = a\napi_token = a\n[Discord]\nwebhook_url = a\n"
+    "message_template = {component[name]\n",
+    "[Cachet]\napi_url = a\napi_token = a\n[Discord]\nwebhook_url = a\n"
+    "message_template = a\n[Digest]\nperiod = weekly\n",
+    "[Cachet]\napi_url = a\napi_token = a\n[Discord]\nwebhook_url = a\n"
+    "message_template = a\n[Maintenance]\nmode = ignore\n",
+])
+def test_settings_validation(tmpdir_factory, content):
+    """Asserts that load raises SettingsError on invalid configuration files."""
+
+    tmpfile = tmpdir_factory.mktemp('data').join('config.ini')
+    tmpfile.write(content)
+    with pytest.raises(unit.SettingsError):
+        unit.load(tmpfile.strpath)
+
+
+def test_settings_mapping(tmpdir_factory):
+    """Asserts that mapping settings are parsed into integer dicts."""
+
+    tmpfile = tmpdir_factory.mktemp('data').join('config.ini')
+    with open(FIXTURE_PATH, 'r') as fixture_file:
+        tmpfile.write(fixture_file.read() + "\n[Delivery]\ngroup_importance = 1:10, 2 : 5,\n")
+
+    assert unit.load(tmpfile.strpath).delivery_group_importance == {1: 10, 2: 5}
+    with pytest.raises(ValueError):
+        unit.parse_mapping("1:10, 2")
+
+
+def test_settings_integers(tmpdir_factory):
+    """Asserts that integer list settings are parsed into tuples."""
+
+    tmpfile = tmpdir_factory.mktemp('data').join('config.ini')
+    with open(FIXTURE_PATH, 'r') as fixture_file:
+        tmpfile.write(fixture_file.read() + "\n[Maintenance]\nreminders = 86400, 3600,\n")
+
+    assert unit.load(tmpfile.strpath).maintenance_reminders == (86400, 3600)
+    assert unit.load(FIXTURE_PATH).maintenance_reminders == (3600,)
+
+
+def test_settings_metric_rules(tmpdir_factory):
+    """Asserts that `[Metric <id>]` sections are parsed into metric rules."""
+
+    tmpfile = tmpdir_factory.mktemp('data').join('config.ini')
+    with open(FIXTURE_PATH, 'r') as fixture_file:
+        tmpfile.write(fixture_file.read() + "\n[Metric 3]\nabove = 500\nwindow = 5\n"
+                      "mean_below = 10.5\n")
+
+    assert unit.load(tmpfile.strpath).metric_rules == (
+        unit.metrics.MetricRule(3, 'above', 500.0, 5),
+        unit.metrics.MetricRule(3, 'mean_below', 10.5, 5),
+    )
+    tmpfile.write("\n[Metric 4]\nabove = lots\n", mode='a')
+    with pytest.raises(unit.SettingsError):
+        unit.load(tmpfile.strpath)
+
+
+def test_settings_missing_file(tmpdir_factory):
+    """Asserts that load raises SettingsError on missing configuration files."""
+
+    with pytest.raises(unit.SettingsError):
+        unit.load(tmpdir_factory.mktemp('data').join('missing.ini').strpath)
+
+
+def test_settings_reloading(cachcord_config_file):  # pylint: disable=W0621
+    """Asserts that ReloadableSettings reloads modified files and keeps the last valid one."""
+
+    config = unit.ReloadableSettings(cachcord_config_file.strpath)
+    initial = config.current
+    assert config.refresh() is initial
+
+    cachcord_config_file.write("\n[Digest]\nperiod = 3600\n", mode='a')
+    os.utime(cachcord_config_file.strpath, ns=(0, 0))
+    assert config.refresh().digest_period == 3600
+    assert initial.digest_period == 7 * 86400
+
+    reloaded = config.current
+    cachcord_config_file.write("[Cachet\n")
+    assert config.refresh() is reloaded
+
+    config.request_reload()
+    assert config.refresh() is reloaded
+    assert not config.reload_requested
+
 #  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :
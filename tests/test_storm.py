@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+"""cachcord.storm unit tests."""
+
+import arrow
+
+from cachcord import storm as unit
+
+
+def _component(component_id, status, group_id=1):
+    return {'id': component_id, 'name': "Component %d" % component_id, 'status': status,
+            'group_id': group_id}
+
+
+def test_detector_run_threshold():
+    """Asserts that StormDetector reports a storm per run, then settles once."""
+
+    detector = unit.StormDetector(dict(), threshold=3)
+
+    assert detector.update(2) is None
+    assert detector.update(3) == unit.STORM
+    assert detector.update(5) == unit.STORM
+    assert detector.update(1) == unit.SETTLED
+    assert detector.update(0) is None
+
+
+def test_detector_window():
+    """Asserts that StormDetector sums changes over the rolling window."""
+
+    storage = dict()
+    detector = unit.StormDetector(storage, threshold=5, window=60)
+
+    assert detector.update(2, now=arrow.get(0)) is None
+    assert detector.update(2, now=arrow.get(30)) is None
+    assert detector.update(2, now=arrow.get(50)) == unit.STORM
+    assert detector.update(0, now=arrow.get(100)) == unit.SETTLED
+    assert storage['storm']['runs'] == [(50, 2), (100, 0)]
+
+
+def test_detector_quiet_runs():
+    """Asserts that StormDetector reports nothing on quiet runs inside a storm's window."""
+
+    detector = unit.StormDetector(dict(), threshold=5, window=60)
+
+    assert detector.update(50, now=arrow.get(0)) == unit.STORM
+    assert detector.update(0, now=arrow.get(10)) is None
+    assert detector.update(0, now=arrow.get(20)) is None
+    assert detector.update(1, now=arrow.get(30)) == unit.STORM
+    assert detector.update(0, now=arrow.get(100)) == unit.SETTLED
+
+
+def test_summarize():
+    """Asserts that storm summaries count changes per status and group, truncating names."""
+
+    components = [_component(component_id, 4) for component_id in range(1, 4)]
+    components.append(_component(4, 1, group_id=2))
+    components.append(_component(5, 3, group_id=None))
+
+    assert unit.summarize(components, group_names={1: "Servers"}, max_names=2) == [
+        "**:rotating_light: Incident storm: 5 components changed status**",
+        "By status: Major Outage: 3, Operational: 1, Partial Outage: 1",
+        "By group: Servers: 3, Group 2: 1, Ungrouped: 1",
+        "Affected: `Component 1`, `Component 2` and 3 more",
+    ]
+
+
+def test_reconcile():
+    """Asserts that reconciliation summaries list components still affected."""
+
+    components = [_component(1, 1), _component(2, 2)]
+
+    assert unit.reconcile(components) == [
+        "**:ballot_box_with_check: Incident storm settled**",
+        "Still affected: 1 components (Performance Issues: 1)",
+        "By group: Group 1: 1",
+        "Affected: `Component 2`",
+    ]
+    assert unit.reconcile(components[:1])[1] == "All components are operational."
+
+#  vim: set tabstop=4 shiftwidth=4 expandtab autoindent :